@@ -0,0 +1,214 @@
+"""
+여러 세션이 동시에 Code Interpreter를 사용할 때의 격리 / 동시성 / 세션 종료 동작을 확인하는 부하 테스트
+
+실제 tool(tools/code_interpreter.py의 code_interpreter_tool)과 CodeInterpreterRegistry를 사용하여
+N개 세션을 동시에 실행합니다 (--execution-mode llm은 benchmarks/stand_ins.py의 로컬 Container server 사용).
+
+1. 동시 실행: 세션마다 변수 marker와 같은 이름의 파일(./files/marker.txt)을 만든 뒤 N개 세션이 동시에 실행
+   - 세션 간 섞임 없음: 출력, 생성 파일 내용이 자신의 marker이고 파일이 자신의 세션 디렉터리에 저장됨
+   - 직렬화 없음: 전체 시간이 N * sleep의 절반보다 짧음
+2. 세션 종료: max_sessions를 1로 줄이고 세션 0이 실행 중일 때 새 세션을 생성
+   - 실행 중인 세션 0은 종료되지 않고 실행을 마침
+   - 나머지 유휴 세션은 종료됨
+   - 종료된 세션을 다시 사용하면 tool 결과 앞에 재시작 알림이 한 번 붙고, 이전 변수는 없음
+
+사용 예 (저장소 루트에서 실행):
+    python benchmarks/concurrent_sessions.py
+    python benchmarks/concurrent_sessions.py --sessions 16 --sleep-seconds 2 --execution-mode llm
+
+확인 항목 중 하나라도 실패하면 종료 코드 1을 반환합니다.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import threading
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESET_NOTICE_PREFIX = "[알림]"
+
+
+def _setup(part, execution_mode):
+    work_root = tempfile.mkdtemp(prefix="concurrent-sessions-")
+    os.environ.update(
+        ARTIFACT_STORE_DIR=os.path.join(work_root, "files"),
+        CODE_INTERPRETER_DATA_DIR=os.path.join(work_root, "sandbox"),
+        CODE_INTERPRETER_MODE=execution_mode,
+        TRACE_EXPORTER="none",
+    )
+    container_server = None
+    if execution_mode == "llm":
+        from stand_ins import FakeContainerServer
+
+        container_server = FakeContainerServer(os.path.join(work_root, "containers"))
+        os.environ.update(
+            OPENAI_BASE_URL=container_server.base_url,
+            OPENAI_API_BASE=container_server.base_url,
+            OPENAI_API_KEY="concurrent-sessions",
+        )
+    part_dir = os.path.join(REPO_ROOT, part)
+    os.chdir(part_dir)
+    sys.path.insert(0, part_dir)
+    return work_root, container_server
+
+
+def _call(tool, session_id, code):
+    """tool을 실행하고 (텍스트 결과, 생성 파일 경로 리스트)를 반환"""
+    return json.loads(tool.invoke({"code": code}, config={"configurable": {"thread_id": session_id}}))
+
+
+def _run_concurrently(targets):
+    """targets를 동시에 시작하여 모두 끝날 때까지의 시간과 결과를 반환"""
+    barrier = threading.Barrier(len(targets))
+    results = [None] * len(targets)
+
+    def run(index, target):
+        barrier.wait()
+        try:
+            results[index] = target()
+        except Exception as e:
+            results[index] = e
+
+    threads = [threading.Thread(target=run, args=(i, target)) for i, target in enumerate(targets)]
+    started_at = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - started_at, results
+
+
+def check_concurrent_runs(tool, registry, artifact_root, sessions, sleep_seconds):
+    failures = []
+    session_ids = [f"load-{i}" for i in range(sessions)]
+
+    started_at = time.perf_counter()
+    for i, session_id in enumerate(session_ids):
+        _call(tool, session_id, f"marker = {i}")
+    print(f"세션 {sessions}개 준비: {time.perf_counter() - started_at:.2f}s")
+
+    code = (
+        "import time\n"
+        f"time.sleep({sleep_seconds})\n"
+        "print('marker', marker)\n"
+        "with open('./files/marker.txt', 'w') as f:\n"
+        "    f.write(str(marker))\n"
+    )
+    elapsed, results = _run_concurrently(
+        [lambda session_id=session_id: _call(tool, session_id, code) for session_id in session_ids]
+    )
+    for i, (session_id, result) in enumerate(zip(session_ids, results)):
+        if isinstance(result, Exception):
+            failures.append(f"{session_id}: {result!r}")
+            continue
+        text, file_names = result
+        if f"marker {i}" not in text:
+            failures.append(f"{session_id}: 다른 세션의 출력 {text!r}")
+        if len(file_names) != 1:
+            failures.append(f"{session_id}: 생성 파일 {file_names}")
+            continue
+        path = os.path.abspath(file_names[0])
+        if os.path.dirname(path) != os.path.abspath(os.path.join(artifact_root, session_id)):
+            failures.append(f"{session_id}: 다른 디렉터리에 저장됨 {file_names[0]}")
+        with open(path) as f:
+            content = f.read()
+        if content != str(i):
+            failures.append(f"{session_id}: 다른 세션의 파일 내용 {content!r}")
+    serial_seconds = sessions * sleep_seconds
+    print(f"동시 실행 {sessions}개: {elapsed:.2f}s (직렬 실행 시 {serial_seconds:.2f}s)")
+    if sessions > 1 and elapsed >= serial_seconds / 2:
+        failures.append(f"동시 실행이 직렬화됨: {elapsed:.2f}s >= {serial_seconds / 2:.2f}s")
+    if registry.stats()["sessions"] != sessions:
+        failures.append(f"세션 수 {registry.stats()}")
+    return session_ids, failures
+
+
+def check_eviction(tool, registry, session_ids, sleep_seconds):
+    failures = []
+    busy_session, idle_sessions = session_ids[0], session_ids[1:]
+    registry.max_sessions = 1
+
+    busy_result = {}
+    busy_thread = threading.Thread(
+        target=lambda: busy_result.update(
+            result=_call(tool, busy_session, f"import time\ntime.sleep({sleep_seconds * 2})\nprint('marker', marker)")
+        )
+    )
+    busy_thread.start()
+    deadline = time.monotonic() + 30
+    while not registry.get(busy_session).is_busy():
+        if time.monotonic() > deadline:
+            failures.append(f"{busy_session}: 실행이 시작되지 않음")
+            break
+        time.sleep(0.01)
+
+    registry.get_or_create("load-new")
+    with registry._lock:
+        remaining = set(registry._clients)
+    if busy_session not in remaining:
+        failures.append(f"실행 중인 {busy_session}가 종료됨")
+    if remaining & set(idle_sessions):
+        failures.append(f"유휴 세션이 종료되지 않음: {sorted(remaining & set(idle_sessions))}")
+
+    busy_thread.join()
+    text = busy_result.get("result", [""])[0]
+    if "marker 0" not in text:
+        failures.append(f"{busy_session}: 실행 결과 {text!r}")
+    print(f"세션 종료: 남은 세션 {sorted(remaining)}")
+
+    if idle_sessions:
+        evicted_session = idle_sessions[0]
+        text, _ = _call(tool, evicted_session, "print('marker' in globals())")
+        if not text.startswith(RESET_NOTICE_PREFIX):
+            failures.append(f"{evicted_session}: 재시작 알림 없음 {text!r}")
+        if not text.rstrip().endswith("False"):
+            failures.append(f"{evicted_session}: 이전 변수가 남아 있음 {text!r}")
+        text, _ = _call(tool, evicted_session, "print(1)")
+        if text.startswith(RESET_NOTICE_PREFIX):
+            failures.append(f"{evicted_session}: 재시작 알림이 반복됨")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=8, help="동시에 실행할 세션 수")
+    parser.add_argument("--sleep-seconds", type=float, default=1.0, help="세션마다 실행할 코드의 대기 시간")
+    parser.add_argument("--execution-mode", choices=["direct", "llm"], default="direct")
+    parser.add_argument("--part", choices=["part1", "part2"], default="part1")
+    args = parser.parse_args()
+
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    work_root, container_server = _setup(args.part, args.execution_mode)
+
+    from tools import code_interpreter as code_interpreter_tools
+
+    # 이전 설정과 섞이지 않도록 세션 수 제한이 충분한 새 registry로 교체
+    registry = code_interpreter_tools.CodeInterpreterRegistry(max_sessions=args.sessions + 1)
+    code_interpreter_tools.code_interpreter_registry = registry
+    tool = code_interpreter_tools.code_interpreter_tool
+
+    failures = []
+    try:
+        session_ids, run_failures = check_concurrent_runs(
+            tool, registry, os.environ["ARTIFACT_STORE_DIR"], args.sessions, args.sleep_seconds
+        )
+        failures += run_failures
+        failures += check_eviction(tool, registry, session_ids, args.sleep_seconds)
+    finally:
+        with registry._lock:
+            session_ids = list(registry._clients)
+        for session_id in session_ids:
+            registry.remove(session_id)
+        if container_server is not None:
+            container_server.close()
+
+    for failure in failures:
+        print(f"FAIL {failure}")
+    print("OK" if not failures else f"{len(failures)}개 항목 실패")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
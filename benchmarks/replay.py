@@ -0,0 +1,378 @@
+"""
+외부 서비스 없이 실행하는 agent replay benchmark
+
+benchmarks/sessions/의 분석 세션(질문과 기록된 model 응답)을 실제 entry point(part1/main.py, part2/main.py)의
+agent graph로 다시 실행합니다. 유료 서비스는 benchmarks/stand_ins.py의 로컬 stand-in으로 바꿉니다.
+- LLM: 기록된 tool 호출 / 답변을 순서대로 반환하는 ScriptedChatModel
+- BigQuery: 합성 google_trends 데이터를 담은 DuckDB
+- OpenAI Containers (--execution-mode llm): 로컬 HTTP server (openai SDK가 OPENAI_BASE_URL로 호출)
+tool, checkpointer, context 압축, artifact 저장소, 로컬 kernel은 실제 코드를 그대로 사용합니다.
+
+세션마다 새 프로세스에서 실행하며 다음을 보고합니다.
+- turn별 응답 시간의 p50 / p90 / p99와 span(model / tool / BigQuery / Container)별 누적 시간
+- model / BigQuery / Container API 호출 수
+- 이동한 바이트 수 (BigQuery 스캔 / 결과 다운로드, 실행 환경 업로드, Container 다운로드, 생성 파일)
+- 최대 RSS (benchmark 프로세스에는 DuckDB 데이터가 포함되므로 commit 간 비교 용도로 사용)
+
+사용 예 (저장소 루트에서 실행):
+    python benchmarks/replay.py
+    python benchmarks/replay.py --session benchmarks/sessions/part2_weekly_top_terms.json --repeat 3
+    python benchmarks/replay.py --execution-mode llm --output replay.json
+    python benchmarks/replay.py --baseline replay.json --tolerance 0.25
+
+tool 결과에 오류가 있거나, agent가 기록과 다르게 model을 호출하거나, 기준값(--max-*, --baseline)을
+넘으면 종료 코드 1을 반환하므로 네트워크 없는 Linux 환경에서 회귀를 확인할 수 있습니다.
+"""
+import os
+import sys
+import glob
+import json
+import time
+import argparse
+import resource
+import tempfile
+import subprocess
+from collections import Counter
+from types import SimpleNamespace
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_SESSIONS = sorted(glob.glob(os.path.join(REPO_ROOT, "benchmarks", "sessions", "*.json")))
+RESULT_PREFIX = "replay-result: "
+
+# tool 결과가 이 문구로 시작하거나 포함하면 해당 turn을 실패로 봄
+TOOL_ERROR_MARKERS = (
+    "[Code Interpreter 오류]",
+    "Traceback (most recent call last)",
+    "SQL execution failed",
+    "SQL was not executed",
+    "SQL execution timed out",
+    "Invalid aggregation spec",
+)
+
+
+def _peak_rss_of_children():
+    """kernel worker 등 실행 중인 자식 프로세스의 최대 RSS (Linux /proc의 VmHWM)"""
+    peak = 0
+    for pid in filter(str.isdigit, os.listdir("/proc")):
+        try:
+            with open(f"/proc/{pid}/status") as f:
+                fields = dict(line.split(":", 1) for line in f if ":" in line)
+        except OSError:
+            continue
+        if fields.get("PPid", "").strip() == str(os.getpid()) and "VmHWM" in fields:
+            peak = max(peak, int(fields["VmHWM"].split()[0]) * 1024)
+    return peak
+
+
+def _directory_bytes(path):
+    return sum(
+        os.path.getsize(os.path.join(directory, name))
+        for directory, _, names in os.walk(path)
+        for name in names
+    )
+
+
+def _tool_errors(agent, config):
+    """마지막 질문 이후의 tool 결과 중 오류가 있는 결과"""
+    from langchain_core.messages import HumanMessage, ToolMessage
+
+    messages = agent.get_state(config).values["messages"]
+    last_question = max(i for i, message in enumerate(messages) if isinstance(message, HumanMessage))
+    return [
+        f"{message.name}: {str(message.content)[:300]}"
+        for message in messages[last_question:]
+        if isinstance(message, ToolMessage)
+        and any(marker in str(message.content) for marker in TOOL_ERROR_MARKERS)
+    ]
+
+
+def _replay(session_path, execution_mode, model_latency_seconds, rows):
+    """측정용 subprocess 안에서 실행됨. 결과를 RESULT_PREFIX로 시작하는 JSON 한 줄로 출력"""
+    from stand_ins import (
+        DuckDBBigQueryClient,
+        FakeContainerServer,
+        FakeQueryJobConfig,
+        ScriptedChatModel,
+        script_to_messages,
+    )
+
+    with open(session_path, encoding="utf-8") as f:
+        session = json.load(f)
+    part_dir = os.path.join(REPO_ROOT, session["part"])
+    work_root = tempfile.mkdtemp(prefix="replay-")
+    os.environ.update(
+        CHECKPOINTER_DB_PATH=os.path.join(work_root, "checkpoints.sqlite"),
+        ARTIFACT_STORE_DIR=os.path.join(work_root, "files"),
+        CODE_INTERPRETER_DATA_DIR=os.path.join(work_root, "sandbox"),
+        CODE_INTERPRETER_MODE=execution_mode,
+        TRACE_EXPORTER="none",
+    )
+    container_server = None
+    if execution_mode == "llm":
+        container_server = FakeContainerServer(os.path.join(work_root, "containers"))
+        os.environ.update(
+            OPENAI_BASE_URL=container_server.base_url,
+            OPENAI_API_BASE=container_server.base_url,
+            OPENAI_API_KEY="replay",
+        )
+    os.chdir(part_dir)
+    sys.path.insert(0, part_dir)
+
+    import streamlit as st
+    import main
+    from src.tracing import get_trace_collector, trace_span
+
+    bigquery = None
+    if session["part"] == "part2":
+        from tools import bigquery as bigquery_tools
+
+        bigquery = DuckDBBigQueryClient(rows=rows)
+        bigquery_tools._bigquery = lambda: SimpleNamespace(QueryJobConfig=FakeQueryJobConfig)
+        bigquery_tools._get_bigquery_client = lambda project_id: bigquery
+        bigquery_tools._get_bigquery_storage_client = lambda: None
+        # 이전 실행의 디스크 캐시를 사용하지 않도록 빈 캐시로 교체
+        bigquery_tools.query_result_cache = bigquery_tools.QueryResultCache(
+            cache_dir=os.path.join(work_root, "cache")
+        )
+
+    model = ScriptedChatModel(
+        responses=script_to_messages(session["turns"]), latency_seconds=model_latency_seconds
+    )
+    main.get_chat_model = lambda name: model
+    main.init_page()
+    # 실행 환경(kernel / Container)은 처음 사용할 때 만들어지므로, 페이지를 연 뒤 첫 질문 전에
+    # 준비가 끝난 상태를 재현하여 turn 시간에 시작 비용이 섞이지 않게 함
+    main.get_code_interpreter_client().executor
+
+    # main.csv_upload()과 같은 방식으로 업로드하고 시스템 프롬프트에 파일 정보를 추가
+    uploads = {}
+    for upload in session.get("uploads", []):
+        client = main.get_code_interpreter_client()
+        with open(os.path.join(REPO_ROOT, upload), "rb") as f:
+            filename, file_path = client.upload_file(f, os.path.basename(upload))
+        st.session_state.custom_system_prompt += (
+            f"\n업로드한 파일명: {filename}\n (Code Interpreter Sandbox path: {file_path})\n "
+            f"{client.describe_dataset(filename)}\n"
+        )
+        uploads[os.path.basename(upload)] = file_path
+    model.variables = {"uploads": uploads}
+
+    turns = []
+    collector = get_trace_collector()
+    for turn in session["turns"]:
+        st.session_state.messages.append({"role": "user", "content": turn["prompt"]})
+        config = {"configurable": {"thread_id": st.session_state["thread_id"], "turn": main.current_turn()}}
+        expected_calls = model.calls + len(turn["responses"])
+        errors = []
+        started_at = time.perf_counter()
+        with trace_span("agent.turn", turn=config["configurable"]["turn"]) as span:
+            try:
+                agent = main.get_data_analysis_agent(main.MODELS[0])
+                answer = main.stream_agent_response(agent, turn["prompt"], config)
+            except Exception as e:
+                answer = ""
+                errors.append(f"{type(e).__name__}: {e}")
+        seconds = time.perf_counter() - started_at
+        st.session_state.messages.append({"role": "assistant", "content": answer})
+        if not errors:
+            errors = _tool_errors(agent, config)
+            if model.calls != expected_calls:
+                errors.append(f"model was called {model.calls} times, the script expects {expected_calls}")
+
+        span_seconds = Counter()
+        for record in collector.get_trace(span.get_span_context().trace_id):
+            if record["name"] != "agent.turn":
+                span_seconds[record["name"]] += (record["end"] - record["start"]) / 1e9
+        turns.append({"seconds": seconds, "errors": errors, "span_seconds": dict(span_seconds)})
+        if errors:
+            break
+
+    counters = Counter({"model.calls": model.calls})
+    data_bytes = Counter()
+    client = main.get_code_interpreter_client()
+    if bigquery is not None:
+        counters.update({f"bigquery.{key}": value for key, value in bigquery.counters.items() if not key.endswith("bytes")})
+        data_bytes.update(bigquery_processed=bigquery.counters["processed_bytes"], bigquery_result=bigquery.counters["result_bytes"])
+    if container_server is not None:
+        counters.update({key: value for key, value in container_server.counters.items() if not key.endswith("bytes")})
+        data_bytes.update(
+            executor_upload=container_server.counters["upload_bytes"],
+            container_download=container_server.counters["download_bytes"],
+        )
+    else:
+        data_bytes.update(executor_upload=_directory_bytes(os.path.join(client.executor.work_dir, "uploads")))
+    data_bytes.update(artifacts=main.get_artifact_store().stats()["bytes"])
+    peak_kernel_rss_bytes = _peak_rss_of_children()
+
+    main.code_interpreter_registry.remove(st.session_state["thread_id"])
+    if container_server is not None:
+        container_server.close()
+    peak_kernel_rss_bytes = max(
+        peak_kernel_rss_bytes, resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * 1024
+    )
+    print(RESULT_PREFIX + json.dumps({
+        "session": session["name"],
+        "part": session["part"],
+        "execution_mode": execution_mode,
+        "turns": turns,
+        "counters": dict(counters),
+        "bytes": dict(data_bytes),
+        # Linux의 ru_maxrss는 KB 단위
+        "peak_rss_bytes": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024,
+        "peak_kernel_rss_bytes": peak_kernel_rss_bytes,
+    }), flush=True)
+    # daemon thread(Container 삭제, warm kernel 등)를 기다리지 않고 종료
+    os._exit(0)
+
+
+def run_session(session_path, execution_mode, model_latency_seconds, rows):
+    result = subprocess.run(
+        [
+            sys.executable, os.path.abspath(__file__),
+            "--worker", session_path,
+            "--execution-mode", execution_mode,
+            "--model-latency-seconds", str(model_latency_seconds),
+            "--rows", str(rows),
+        ],
+        cwd=REPO_ROOT,
+        capture_output=True,
+        text=True,
+    )
+    lines = [line for line in result.stdout.splitlines() if line.startswith(RESULT_PREFIX)]
+    if not lines:
+        # 오류 메시지가 담긴 줄 (없으면 stderr의 마지막 줄)
+        stderr = result.stderr.strip().splitlines()
+        error = [line for line in stderr if "Error" in line][-1:] or stderr[-1:] or ["no output"]
+        return {"session": os.path.basename(session_path), "error": error}
+    return json.loads(lines[-1][len(RESULT_PREFIX):])
+
+
+def percentile(values, q):
+    """nearest-rank 방식의 백분위수"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, round(q / 100 * len(ordered) + 0.5) - 1))]
+
+
+def summarize(results):
+    seconds = [turn["seconds"] for result in results for turn in result["turns"]]
+    counters, data_bytes, span_seconds = Counter(), Counter(), Counter()
+    for result in results:
+        counters.update(result["counters"])
+        data_bytes.update(result["bytes"])
+        for turn in result["turns"]:
+            span_seconds.update(turn["span_seconds"])
+    return {
+        "turns": len(seconds),
+        "turn_seconds": {
+            "p50": percentile(seconds, 50),
+            "p90": percentile(seconds, 90),
+            "p99": percentile(seconds, 99),
+            "max": max(seconds, default=None),
+        },
+        "counters": dict(sorted(counters.items())),
+        "bytes": dict(sorted(data_bytes.items())),
+        "span_seconds": dict(span_seconds.most_common()),
+        "peak_rss_bytes": max((result["peak_rss_bytes"] for result in results), default=0),
+        "peak_kernel_rss_bytes": max((result["peak_kernel_rss_bytes"] for result in results), default=0),
+    }
+
+
+def compare_with_baseline(summary, baseline, tolerance):
+    """baseline보다 나빠진 항목의 설명 목록 (호출 수는 늘어나면 회귀, 시간 / 바이트 / 메모리는 tolerance 초과 시 회귀)"""
+    regressions = []
+    for key in ("p50", "p90"):
+        value, base = summary["turn_seconds"][key], baseline["turn_seconds"].get(key)
+        if value is not None and base and value > base * (1 + tolerance):
+            regressions.append(f"turn {key} {value:.3f}s > baseline {base:.3f}s")
+    for key, value in summary["counters"].items():
+        base = baseline["counters"].get(key, 0)
+        if value > base:
+            regressions.append(f"{key} {value} > baseline {base}")
+    for key, value in summary["bytes"].items():
+        base = baseline["bytes"].get(key, 0)
+        if value > base * (1 + tolerance):
+            regressions.append(f"bytes {key} {value:,} > baseline {base:,}")
+    for key in ("peak_rss_bytes", "peak_kernel_rss_bytes"):
+        base = baseline.get(key)
+        if base and summary[key] > base * (1 + tolerance):
+            regressions.append(f"{key} {summary[key] / 2**20:.0f}MB > baseline {base / 2**20:.0f}MB")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--session", action="append", help="실행할 세션 파일 (여러 번 지정 가능)")
+    parser.add_argument("--execution-mode", choices=["direct", "llm"], default="direct")
+    parser.add_argument("--repeat", type=int, default=1, help="세션별 반복 횟수")
+    parser.add_argument("--model-latency-seconds", type=float, default=0.0, help="model 호출마다 추가할 지연 시간")
+    parser.add_argument("--rows", type=int, default=200_000, help="DuckDB 합성 테이블의 행 수")
+    parser.add_argument("--output", help="결과를 JSON으로 저장할 경로 (--baseline으로 비교 가능)")
+    parser.add_argument("--baseline", help="이전에 --output으로 저장한 결과")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    parser.add_argument("--max-turn-p90-seconds", type=float, default=None)
+    parser.add_argument("--max-peak-rss-mb", type=float, default=None)
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        _replay(args.worker, args.execution_mode, args.model_latency_seconds, args.rows)
+        return
+
+    failed = False
+    results = []
+    for session_path in args.session or DEFAULT_SESSIONS:
+        for _ in range(args.repeat):
+            result = run_session(os.path.abspath(session_path), args.execution_mode, args.model_latency_seconds, args.rows)
+            print(f"== {result['session']} ({args.execution_mode})")
+            if "error" in result:
+                print(f"  error: {result['error'][0]}")
+                failed = True
+                continue
+            results.append(result)
+            for index, turn in enumerate(result["turns"], start=1):
+                print(f"  turn {index}: {turn['seconds']:.3f}s")
+                for error in turn["errors"]:
+                    print(f"    error: {error}")
+                    failed = True
+            print(f"  peak RSS {result['peak_rss_bytes'] / 2**20:.0f}MB, kernel {result['peak_kernel_rss_bytes'] / 2**20:.0f}MB")
+
+    summary = summarize(results)
+    summary["execution_mode"] = args.execution_mode
+    print("== summary")
+    print(f"  turns: {summary['turns']}")
+    for key, value in summary["turn_seconds"].items():
+        print(f"  turn {key}: {'-' if value is None else f'{value:.3f}s'}")
+    for key, value in summary["counters"].items():
+        print(f"  {key}: {value}")
+    for key, value in summary["bytes"].items():
+        print(f"  bytes {key}: {value:,}")
+    for name, seconds in list(summary["span_seconds"].items())[:10]:
+        print(f"  span {name}: {seconds:.3f}s")
+    print(f"  peak RSS: {summary['peak_rss_bytes'] / 2**20:.0f}MB, kernel {summary['peak_kernel_rss_bytes'] / 2**20:.0f}MB")
+
+    p90 = summary["turn_seconds"]["p90"]
+    if args.max_turn_p90_seconds is not None and p90 is not None and p90 > args.max_turn_p90_seconds:
+        print(f"  turn p90 limit {args.max_turn_p90_seconds:.3f}s exceeded")
+        failed = True
+    if args.max_peak_rss_mb is not None and summary["peak_rss_bytes"] > args.max_peak_rss_mb * 2**20:
+        print(f"  peak RSS limit {args.max_peak_rss_mb:.0f}MB exceeded")
+        failed = True
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline.get("execution_mode") != args.execution_mode:
+            print(f"  baseline was recorded with --execution-mode {baseline.get('execution_mode')}")
+            failed = True
+        for regression in compare_with_baseline(summary, baseline, args.tolerance):
+            print(f"  regression: {regression}")
+            failed = True
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(summary, f, indent=2)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,625 @@
+"""
+replay benchmark(benchmarks/replay.py)에서 유료 외부 서비스 대신 사용하는 로컬 stand-in
+
+- ScriptedChatModel: 세션 스크립트에 기록된 응답(tool 호출 / 최종 답변)을 순서대로 반환하는 chat model
+- DuckDBBigQueryClient: google.cloud.bigquery.Client 대신 로컬 DuckDB에서 쿼리를 실행
+  (google_trends와 같은 스키마의 합성 데이터, dry run 스캔량 추정, maximum_bytes_billed 확인)
+- FakeContainerServer: OpenAI Containers API와 Responses API의 code_interpreter 호출을 흉내 내는
+  로컬 HTTP server (openai SDK / ChatOpenAI가 OPENAI_BASE_URL로 이 server를 호출)
+
+모든 stand-in은 호출 횟수와 주고받은 바이트 수를 counters에 기록합니다.
+"""
+import os
+import re
+import json
+import time
+import shutil
+import threading
+import itertools
+from collections import Counter
+from datetime import datetime, timezone
+from email.parser import BytesParser
+from email.policy import default as default_policy
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+
+# ---------------------------------------------------------------------------
+# LLM
+# ---------------------------------------------------------------------------
+
+_PLACEHOLDER_PATTERN = re.compile(r"\{\{(\w+)(?::([^}]+))?\}\}")
+_QUERY_RESULT_PATH_PATTERN = re.compile(r"accessible in Code Interpreter: (\S+?)\)")
+
+
+class ScriptExhaustedError(RuntimeError):
+    """agent가 스크립트에 기록된 것보다 model을 더 많이 호출함"""
+
+
+def script_to_messages(turns):
+    """세션 스크립트의 turn별 responses를 AIMessage 리스트로 변환 (turn 순서대로 이어 붙임)"""
+    messages = []
+    for turn_index, turn in enumerate(turns):
+        for step_index, response in enumerate(turn["responses"]):
+            tool_calls = [
+                {
+                    "name": call["name"],
+                    "args": call["args"],
+                    "id": f"call_{turn_index}_{step_index}_{call_index}",
+                    "type": "tool_call",
+                }
+                for call_index, call in enumerate(response.get("tool_calls", []))
+            ]
+            messages.append(AIMessage(content=response.get("content", ""), tool_calls=tool_calls))
+    return messages
+
+
+class ScriptedChatModel(BaseChatModel):
+    """
+    기록된 응답을 순서대로 반환하는 chat model
+
+    tool 호출 인자의 {{...}} placeholder는 실행 시점의 값으로 바꿉니다
+    (실제 모델이 이전 tool 결과를 읽고 경로를 채우는 것과 같음)
+    - {{upload_path:<파일명>}}: 세션 시작 시 업로드한 파일의 실행 환경 경로
+    - {{last_query_result_path}}: 가장 최근 exec_query / aggregate_query 결과 파일의 경로
+    """
+
+    responses: list
+    variables: dict = {}
+    latency_seconds: float = 0.0
+    calls: int = 0
+
+    @property
+    def _llm_type(self):
+        return "scripted"
+
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+    def _resolve(self, value, messages):
+        if isinstance(value, dict):
+            return {key: self._resolve(item, messages) for key, item in value.items()}
+        if isinstance(value, list):
+            return [self._resolve(item, messages) for item in value]
+        if not isinstance(value, str):
+            return value
+
+        def replace(match):
+            name, argument = match.groups()
+            if name == "upload_path":
+                return self.variables["uploads"][argument]
+            if name == "last_query_result_path":
+                for message in reversed(messages):
+                    if isinstance(message, ToolMessage):
+                        found = _QUERY_RESULT_PATH_PATTERN.search(str(message.content))
+                        if found:
+                            return found.group(1)
+                raise KeyError("no query result file in the conversation")
+            raise KeyError(f"unknown placeholder: {match.group(0)}")
+
+        return _PLACEHOLDER_PATTERN.sub(replace, value)
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        if not self.responses:
+            raise ScriptExhaustedError("the agent called the model more often than the script records")
+        response = self.responses.pop(0)
+        if self.latency_seconds:
+            time.sleep(self.latency_seconds)
+        self.calls += 1
+        if response.tool_calls:
+            response = response.model_copy(update={
+                "tool_calls": [
+                    {**call, "args": self._resolve(call["args"], messages)} for call in response.tool_calls
+                ]
+            })
+        return ChatResult(generations=[ChatGeneration(message=response)])
+
+
+# ---------------------------------------------------------------------------
+# BigQuery
+# ---------------------------------------------------------------------------
+
+# BigQuery는 참조한 테이블마다 최소 10MB를 과금
+_MIN_BYTES_PER_TABLE = 10 * 1024**2
+_BIGQUERY_TYPES = {
+    "BIGINT": "INT64",
+    "INTEGER": "INT64",
+    "DOUBLE": "FLOAT64",
+    "VARCHAR": "STRING",
+    "DATE": "DATE",
+    "TIMESTAMP": "TIMESTAMP",
+    "BOOLEAN": "BOOL",
+}
+_TABLE_PATH_PATTERN = re.compile(r"`([\w-]+)\.(\w+)\.(\w+(?:\.\w+)?)`")
+_TRUNC_PATTERN = re.compile(r"\b(?:DATE|DATETIME|TIMESTAMP)_TRUNC\(\s*([^,()]+?)\s*,\s*(\w+)\s*\)", re.IGNORECASE)
+_IN_LIST_PATTERN = re.compile(r"table_name\s+IN\s*\(([^)]*)\)", re.IGNORECASE)
+
+# google_trends 공개 데이터셋과 같은 스키마의 합성 데이터 (i: 0..rows-1)
+_WEEK = "DATE '2024-01-07' + CAST(7 * ((i // 5250) % 104) AS INTEGER)"
+_REFRESH_DATE = "DATE '2026-01-04' - CAST(i // 546000 AS INTEGER)"
+_SYNTHETIC_TABLES = {
+    "top_terms": f"""
+        SELECT
+            'DMA ' || (i % 210) AS dma_name,
+            500 + i % 210 AS dma_id,
+            'term ' || ((i // 210 * 31 + i % 210) % 500) AS term,
+            {_WEEK} AS week,
+            CAST(100 - 3 * ((i // 210) % 25) - i % 7 AS BIGINT) AS score,
+            (i // 210) % 25 + 1 AS rank,
+            {_REFRESH_DATE} AS refresh_date
+        FROM range(?) t(i)
+    """,
+    "top_rising_terms": f"""
+        SELECT
+            'DMA ' || (i % 210) AS dma_name,
+            500 + i % 210 AS dma_id,
+            'rising ' || ((i // 210 * 17 + i % 210) % 800) AS term,
+            {_WEEK} AS week,
+            CAST(100 - 3 * ((i // 210) % 25) - i % 5 AS BIGINT) AS score,
+            (i // 210) % 25 + 1 AS rank,
+            CAST((i * 37) % 5000 AS BIGINT) AS percent_gain,
+            {_REFRESH_DATE} AS refresh_date
+        FROM range(?) t(i)
+    """,
+    "international_top_terms": f"""
+        SELECT
+            'Country ' || (i % 50) AS country_name,
+            'C' || (i % 50) AS country_code,
+            'Region ' || (i % 400) AS region_name,
+            'R' || (i % 400) AS region_code,
+            'term ' || ((i // 400 * 13 + i % 400) % 900) AS term,
+            {_WEEK} AS week,
+            CAST(100 - 3 * ((i // 400) % 25) - i % 7 AS BIGINT) AS score,
+            (i // 400) % 25 + 1 AS rank,
+            {_REFRESH_DATE} AS refresh_date
+        FROM range(?) t(i)
+    """,
+}
+
+
+class FakeQueryJobConfig:
+    """google.cloud.bigquery.QueryJobConfig 중 BigQueryClient가 사용하는 옵션만 보관"""
+
+    def __init__(self, dry_run=False, use_query_cache=True, maximum_bytes_billed=None, **kwargs):
+        self.dry_run = dry_run
+        self.use_query_cache = use_query_cache
+        self.maximum_bytes_billed = maximum_bytes_billed
+
+
+class FakeRowIterator:
+    def __init__(self, client, table, page_size=None):
+        self._client = client
+        self._table = table
+        self._page_size = page_size
+
+    def to_dataframe(self, create_bqstorage_client=True):
+        self._client.count("result_bytes", self._table.nbytes)
+        return self._table.to_pandas()
+
+    def to_arrow_iterable(self, bqstorage_client=None):
+        for batch in self._table.to_batches(max_chunksize=self._page_size):
+            self._client.count("result_bytes", batch.nbytes)
+            yield batch
+
+
+class FakeQueryJob:
+    def __init__(self, client, job_id, query, job_config):
+        self._client = client
+        self.job_id = job_id
+        self.query = query
+        self.state = "DONE"
+        self.query_plan = []
+        self.created = self.started = datetime.now(timezone.utc)
+        self.total_bytes_processed = client.estimate_bytes(query)
+        self.slot_millis = 0
+        self._table = None
+        self._error = None
+        if job_config is not None and job_config.dry_run:
+            return
+        limit = getattr(job_config, "maximum_bytes_billed", None)
+        if limit is not None and self.total_bytes_processed > limit:
+            self._error = RuntimeError(
+                f"Query exceeded limit for bytes billed: {limit}. "
+                f"{self.total_bytes_processed} or higher required."
+            )
+            return
+        started_at = time.perf_counter()
+        self._table = client.execute(query)
+        self.slot_millis = int((time.perf_counter() - started_at) * 1000)
+
+    def done(self):
+        return True
+
+    def reload(self):
+        pass
+
+    def cancel(self):
+        return True
+
+    def result(self, page_size=None):
+        if self._error is not None:
+            raise self._error
+        return FakeRowIterator(self._client, self._table, page_size)
+
+
+class DuckDBBigQueryClient:
+    """
+    google.cloud.bigquery.Client 대신 사용하는 DuckDB 기반 stand-in
+
+    BigQuery SQL 중 이 저장소가 사용하는 부분만 DuckDB SQL로 바꿔 실행합니다
+    (`project.dataset.table` 경로, INFORMATION_SCHEMA, DATE_TRUNC(x, WEEK) 등)
+    스캔량은 쿼리에 등장하는 컬럼의 실제 크기 합계로 추정합니다 (SELECT *는 전체 컬럼)
+    """
+
+    def __init__(self, rows=200_000):
+        import duckdb
+
+        self._conn = duckdb.connect()
+        self._lock = threading.Lock()
+        self._job_ids = itertools.count(1)
+        self.counters = Counter()
+        for name, sql in _SYNTHETIC_TABLES.items():
+            self._conn.execute(f"CREATE TABLE {name} AS {sql}", [rows])
+        self._column_bytes = {name: self._measure_columns(name) for name in _SYNTHETIC_TABLES}
+
+    def _measure_columns(self, table_name):
+        columns = self._conn.execute(
+            "SELECT column_name, data_type FROM information_schema.columns WHERE table_name = ?",
+            [table_name],
+        ).fetchall()
+        sizes = {}
+        for column, data_type in columns:
+            if data_type == "VARCHAR":
+                # BigQuery의 STRING은 2바이트 + UTF-8 길이
+                sizes[column] = self._conn.execute(
+                    f'SELECT COALESCE(SUM(strlen("{column}") + 2), 0) FROM {table_name}'
+                ).fetchone()[0]
+            else:
+                sizes[column] = 8 * self._conn.execute(f"SELECT COUNT(*) FROM {table_name}").fetchone()[0]
+        return sizes
+
+    def count(self, key, amount=1):
+        with self._lock:
+            self.counters[key] += amount
+
+    def estimate_bytes(self, query):
+        tables = {match.group(3) for match in _TABLE_PATH_PATTERN.finditer(query)} & set(self._column_bytes)
+        select_all = re.search(r"SELECT\s+\*", query, re.IGNORECASE) is not None
+        total = 0
+        for table in tables:
+            for column, size in self._column_bytes[table].items():
+                if select_all or re.search(rf"\b{column}\b", query):
+                    total += size
+        return max(total, _MIN_BYTES_PER_TABLE * len(tables)) if tables else 0
+
+    def to_duckdb_sql(self, query):
+        query = _TABLE_PATH_PATTERN.sub(
+            lambda m: "information_schema.tables" if m.group(3) == "INFORMATION_SCHEMA.TABLES" else m.group(3),
+            query,
+        )
+        query = _TRUNC_PATTERN.sub(lambda m: f"CAST(date_trunc('{m.group(2).lower()}', {m.group(1)}) AS DATE)", query)
+        return query.replace("`", '"')
+
+    def _schema_rows(self, query):
+        """INFORMATION_SCHEMA.COLUMNS를 TO_JSON_STRING(ARRAY_AGG(STRUCT(...)))로 묶는 스키마 쿼리"""
+        import pyarrow as pa
+
+        table_names = re.findall(r'"([^"]+)"', _IN_LIST_PATTERN.search(query).group(1))
+        names, schemas = [], []
+        for table_name in table_names:
+            columns = self._conn.cursor().execute(
+                "SELECT column_name, data_type, is_nullable FROM information_schema.columns "
+                "WHERE table_name = ? ORDER BY ordinal_position",
+                [table_name],
+            ).fetchall()
+            if columns:
+                names.append(table_name)
+                schemas.append(json.dumps([
+                    {
+                        "mode": "NULLABLE" if nullable == "YES" else "REQUIRED",
+                        "name": column,
+                        "type": _BIGQUERY_TYPES.get(data_type, data_type),
+                    }
+                    for column, data_type, nullable in columns
+                ], indent=2))
+        return pa.table({"table_name": names, "schema": schemas})
+
+    def execute(self, query):
+        if "INFORMATION_SCHEMA.COLUMNS" in query:
+            return self._schema_rows(query)
+        return self._conn.cursor().execute(self.to_duckdb_sql(query)).to_arrow_table()
+
+    def query(self, query, job_config=None):
+        dry_run = job_config is not None and job_config.dry_run
+        self.count("dry_runs" if dry_run else "query_jobs")
+        job = FakeQueryJob(self, f"job_{next(self._job_ids)}", query, job_config)
+        if not dry_run:
+            self.count("processed_bytes", job.total_bytes_processed)
+        return job
+
+    def list_rows(self, table_id, max_results=None):
+        self.count("list_rows")
+        table_name = table_id.split(".")[-1]
+        limit = f" LIMIT {int(max_results)}" if max_results is not None else ""
+        return FakeRowIterator(self, self._conn.cursor().execute(f"SELECT * FROM {table_name}{limit}").to_arrow_table())
+
+
+# ---------------------------------------------------------------------------
+# OpenAI Containers / Responses API
+# ---------------------------------------------------------------------------
+
+_CODE_BLOCK_PATTERN = re.compile(r"```python\n(.*?)```", re.DOTALL)
+
+
+def _strings(value):
+    """Responses API input(문자열 / message / content part 리스트)에 들어 있는 문자열"""
+    if isinstance(value, str):
+        yield value
+    elif isinstance(value, dict):
+        for item in value.values():
+            yield from _strings(item)
+    elif isinstance(value, list):
+        for item in value:
+            yield from _strings(item)
+
+
+class FakeContainer:
+    """Container 하나. /mnt/data를 로컬 디렉터리로 바꿔 LocalKernel에서 코드를 실행"""
+
+    def __init__(self, container_id, name, root):
+        from src.executors import LocalKernel
+
+        self.id = container_id
+        self.name = name
+        self.created_at = int(time.time())
+        self.data_dir = os.path.join(root, container_id)
+        os.makedirs(os.path.join(self.data_dir, "files"))
+        self.files = {}  # file_id -> container.file 객체
+        self.kernel = LocalKernel()
+        self.kernel.attach(self.data_dir)
+
+    def add_file(self, file_id, local_path, source):
+        self.files[file_id] = {
+            "id": file_id,
+            "object": "container.file",
+            "container_id": self.id,
+            "path": "/mnt/data/" + os.path.relpath(local_path, self.data_dir),
+            "bytes": os.path.getsize(local_path),
+            "created_at": int(time.time()),
+            "source": source,
+        }
+        return self.files[file_id]
+
+    def local_path(self, file_id):
+        return os.path.join(self.data_dir, self.files[file_id]["path"][len("/mnt/data/"):])
+
+    def snapshot(self):
+        return {
+            os.path.join(directory, name): os.stat(os.path.join(directory, name)).st_mtime_ns
+            for directory, _, names in os.walk(self.data_dir)
+            for name in names
+        }
+
+    def close(self):
+        self.kernel.close()
+        shutil.rmtree(self.data_dir, ignore_errors=True)
+
+
+class FakeContainerServer:
+    """
+    OpenAI Containers API와 code_interpreter tool을 사용하는 Responses API를 흉내 내는 로컬 HTTP server
+
+    ContainerExecutor가 보내는 프롬프트의 ```python 블록을 Container의 LocalKernel에서 실행하고,
+    실행 로그를 code_interpreter_call 출력으로 반환합니다 (파일 인용 annotation은 붙이지 않으므로
+    ContainerExecutor는 files.list로 새 파일을 확인)
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self.containers = {}
+        self.counters = Counter()
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def do_GET(self):
+                server._dispatch(self, "GET")
+
+            def do_POST(self):
+                server._dispatch(self, "POST")
+
+            def do_DELETE(self):
+                server._dispatch(self, "DELETE")
+
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self._httpd.server_address[1]}/v1"
+
+    def close(self):
+        self._httpd.shutdown()
+        for container in list(self.containers.values()):
+            container.close()
+
+    def _new_id(self, prefix):
+        return f"{prefix}_{next(self._ids):06d}"
+
+    def _count(self, key, amount=1):
+        with self._lock:
+            self.counters[key] += amount
+
+    def _dispatch(self, request, method):
+        url = urlparse(request.path)
+        parts = url.path.strip("/").split("/")[1:]  # "v1" 제외
+        length = int(request.headers.get("Content-Length") or 0)
+        body = request.rfile.read(length) if length else b""
+        try:
+            status, payload = self._route(method, parts, parse_qs(url.query), request.headers, body)
+        except KeyError as e:
+            status, payload = 404, {"error": {"message": f"not found: {e}", "type": "invalid_request_error"}}
+        if isinstance(payload, bytes):
+            content_type, data = "application/octet-stream", payload
+        elif isinstance(payload, str):
+            content_type, data = "text/event-stream", payload.encode("utf-8")
+        else:
+            content_type, data = "application/json", json.dumps(payload).encode("utf-8")
+        request.send_response(status)
+        request.send_header("Content-Type", content_type)
+        request.send_header("Content-Length", str(len(data)))
+        request.end_headers()
+        request.wfile.write(data)
+
+    def _route(self, method, parts, params, headers, body):
+        if parts == ["containers"] and method == "POST":
+            return 200, self._create_container(json.loads(body))
+        if parts == ["responses"] and method == "POST":
+            request = json.loads(body)
+            response = self._create_response(request)
+            # agent 안에서 호출되면 LangGraph의 "messages" stream 때문에 ChatOpenAI가 streaming으로 요청함
+            return 200, _event_stream(response) if request.get("stream") else response
+        if len(parts) < 2 or parts[0] != "containers":
+            raise KeyError("/".join(parts))
+        container = self.containers[parts[1]]
+        if len(parts) == 2 and method == "DELETE":
+            self._count("containers.delete")
+            with self._lock:
+                self.containers.pop(container.id)
+            container.close()
+            return 200, {"id": container.id, "object": "container.deleted", "deleted": True}
+        if parts[2:] == ["files"] and method == "POST":
+            return 200, self._upload_file(container, headers["Content-Type"], body)
+        if parts[2:] == ["files"] and method == "GET":
+            self._count("containers.files.list")
+            files = sorted(container.files.values(), key=lambda f: f["id"], reverse=params.get("order") != ["asc"])
+            files = files[: int(params.get("limit", ["20"])[0])]
+            return 200, {
+                "object": "list",
+                "data": files,
+                "first_id": files[0]["id"] if files else None,
+                "last_id": files[-1]["id"] if files else None,
+                "has_more": False,
+            }
+        if len(parts) == 4 and parts[2] == "files" and method == "GET":
+            self._count("containers.files.retrieve")
+            return 200, container.files[parts[3]]
+        if parts[2:3] == ["files"] and parts[4:] == ["content"] and method == "GET":
+            with open(container.local_path(parts[3]), "rb") as f:
+                data = f.read()
+            self._count("containers.files.content")
+            self._count("download_bytes", len(data))
+            return 200, data
+        raise KeyError("/".join(parts))
+
+    def _create_container(self, request):
+        self._count("containers.create")
+        container = FakeContainer(self._new_id("cntr"), request.get("name"), self.root)
+        with self._lock:
+            self.containers[container.id] = container
+        return {
+            "id": container.id,
+            "object": "container",
+            "name": container.name,
+            "created_at": container.created_at,
+            "status": "running",
+        }
+
+    def _upload_file(self, container, content_type, body):
+        message = BytesParser(policy=default_policy).parsebytes(
+            f"Content-Type: {content_type}\r\n\r\n".encode("utf-8") + body
+        )
+        part = next(part for part in message.iter_parts() if part.get_param("name", header="content-disposition") == "file")
+        data = part.get_payload(decode=True)
+        local_path = os.path.join(container.data_dir, os.path.basename(part.get_filename()))
+        with open(local_path, "wb") as f:
+            f.write(data)
+        self._count("containers.files.create")
+        self._count("upload_bytes", len(data))
+        return container.add_file(self._new_id("cfile"), local_path, "user")
+
+    def _create_response(self, request):
+        self._count("responses.create")
+        container = self.containers[request["tools"][0]["container"]]
+        prompt = "\n".join(_strings(request["input"]))
+        found = _CODE_BLOCK_PATTERN.search(prompt)
+        code = found.group(1) if found else ""
+        before = container.snapshot()
+        stdout, stderr = container.kernel.execute(code.replace("/mnt/data", container.data_dir))
+        for path, mtime in container.snapshot().items():
+            if before.get(path) != mtime:
+                container.add_file(self._new_id("cfile"), path, "assistant")
+        logs = (stdout + (f"\n{stderr}" if stderr.strip() else "")).replace(container.data_dir, "/mnt/data")
+        return {
+            "id": self._new_id("resp"),
+            "object": "response",
+            "created_at": int(time.time()),
+            "status": "completed",
+            "model": request.get("model"),
+            "output": [
+                {
+                    "type": "code_interpreter_call",
+                    "id": self._new_id("ci"),
+                    "status": "completed",
+                    "container_id": container.id,
+                    "code": code,
+                    "outputs": [{"type": "logs", "logs": logs}],
+                },
+                {
+                    "type": "message",
+                    "id": self._new_id("msg"),
+                    "role": "assistant",
+                    "status": "completed",
+                    "content": [{"type": "output_text", "text": "코드를 실행했습니다.", "annotations": []}],
+                },
+            ],
+            "parallel_tool_calls": True,
+            "tool_choice": "auto",
+            "tools": request.get("tools", []),
+            "temperature": request.get("temperature"),
+            "top_p": 1.0,
+            "error": None,
+            "incomplete_details": None,
+            "instructions": None,
+            "metadata": {},
+            "text": {"format": {"type": "text"}},
+            "truncation": "disabled",
+            "usage": {
+                "input_tokens": len(prompt) // 4,
+                "input_tokens_details": {"cached_tokens": 0},
+                "output_tokens": len(logs) // 4,
+                "output_tokens_details": {"reasoning_tokens": 0},
+                "total_tokens": (len(prompt) + len(logs)) // 4,
+            },
+        }
+
+
+def _event_stream(response):
+    """Responses API의 streaming 응답(server-sent events)으로 변환. output item은 완성된 상태로 한 번에 보냄"""
+    events = [{"type": "response.created", "response": {**response, "status": "in_progress", "output": []}}]
+    for index, item in enumerate(response["output"]):
+        events.append({"type": "response.output_item.added", "output_index": index, "item": item})
+        if item["type"] == "message":
+            events.append({
+                "type": "response.output_text.delta",
+                "item_id": item["id"],
+                "output_index": index,
+                "content_index": 0,
+                "delta": item["content"][0]["text"],
+                "logprobs": [],
+            })
+        events.append({"type": "response.output_item.done", "output_index": index, "item": item})
+    events.append({"type": "response.completed", "response": response})
+    return "".join(
+        f"event: {event['type']}\ndata: {json.dumps({**event, 'sequence_number': number})}\n\n"
+        for number, event in enumerate(events)
+    )
@@ -0,0 +1,148 @@
+"""
+Streamlit entry point의 시작 시간 benchmark
+
+각 entry point(part1/main.py 등)를 새 프로세스에서 측정합니다.
+- import: 모듈 import에 걸린 시간과 누적 import 시간이 긴 모듈
+- cold start: 새 세션에서 페이지를 처음 그릴 때까지의 시간 (streamlit AppTest)
+- rerun: 같은 세션에서 다시 실행(rerun)할 때의 시간
+또한 페이지를 열기만 했을 때 provider SDK / BigQuery SDK가 import되지 않았는지 확인합니다.
+
+사용 예 (저장소 루트에서 실행):
+    python benchmarks/startup.py
+    python benchmarks/startup.py --entry part2/main.py --max-cold-start-seconds 5
+
+기준값을 넘거나 지연 import 대상 모듈이 로드되면 종료 코드 1을 반환하므로 회귀를 확인할 수 있습니다.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import subprocess
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_ENTRIES = ["part1/main.py", "part1/main_handler.py", "part2/main.py", "part2/main_handler.py"]
+
+# 페이지를 열기만 했을 때는 import되지 않아야 하는 모듈 (선택한 모델 / 첫 질문 시점에 import)
+LAZY_MODULES = [
+    "langchain_openai",
+    "langchain_anthropic",
+    "langchain_google_genai",
+    "openai",
+    "anthropic",
+    "google.cloud.bigquery",
+]
+
+
+def _measure(entry, reruns):
+    """측정용 subprocess 안에서 실행됨. 결과를 JSON 한 줄로 출력"""
+    app_dir, script = os.path.split(os.path.abspath(entry))
+    os.chdir(app_dir)
+    sys.path.insert(0, app_dir)
+    module_name = os.path.splitext(script)[0]
+
+    started_at = time.perf_counter()
+    __import__(module_name)
+    import_seconds = time.perf_counter() - started_at
+
+    from streamlit.testing.v1 import AppTest
+
+    app = AppTest.from_file(script, default_timeout=120)
+    started_at = time.perf_counter()
+    app.run()
+    cold_start_seconds = time.perf_counter() - started_at
+    rerun_seconds = []
+    for _ in range(reruns):
+        started_at = time.perf_counter()
+        app.run()
+        rerun_seconds.append(time.perf_counter() - started_at)
+
+    print(json.dumps({
+        "entry": entry,
+        "import_seconds": import_seconds,
+        "cold_start_seconds": cold_start_seconds,
+        "rerun_seconds": sorted(rerun_seconds)[len(rerun_seconds) // 2] if rerun_seconds else None,
+        "exceptions": [str(e.value) for e in app.exception],
+        "lazy_modules_loaded": [name for name in LAZY_MODULES if name in sys.modules],
+    }))
+
+
+def _slowest_imports(entry, top):
+    """python -X importtime으로 누적 import 시간이 긴 모듈을 구함"""
+    app_dir, script = os.path.split(os.path.abspath(entry))
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {os.path.splitext(script)[0]}"],
+        cwd=app_dir,
+        capture_output=True,
+        text=True,
+    )
+    imports = []
+    for line in result.stderr.splitlines():
+        # 형식: "import time: self [us] | cumulative | imported package"
+        parts = line.split("|")
+        if not line.startswith("import time:") or len(parts) != 3 or not parts[1].strip().isdigit():
+            continue
+        imports.append((int(parts[1]), parts[2].strip()))
+    return sorted(imports, reverse=True)[:top]
+
+
+def run_benchmark(entry, reruns):
+    result = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--worker", entry, "--reruns", str(reruns)],
+        cwd=REPO_ROOT,
+        capture_output=True,
+        text=True,
+    )
+    lines = [line for line in result.stdout.splitlines() if line.startswith("{")]
+    if result.returncode != 0 or not lines:
+        return {"entry": entry, "error": result.stderr.strip().splitlines()[-1:] or ["no output"]}
+    return json.loads(lines[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--entry", action="append", help="측정할 entry point (여러 번 지정 가능)")
+    parser.add_argument("--reruns", type=int, default=5)
+    parser.add_argument("--top-imports", type=int, default=10)
+    parser.add_argument("--max-import-seconds", type=float, default=None)
+    parser.add_argument("--max-cold-start-seconds", type=float, default=None)
+    parser.add_argument("--max-rerun-seconds", type=float, default=None)
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        _measure(args.worker, args.reruns)
+        return
+
+    limits = {
+        "import_seconds": args.max_import_seconds,
+        "cold_start_seconds": args.max_cold_start_seconds,
+        "rerun_seconds": args.max_rerun_seconds,
+    }
+    failed = False
+    for entry in args.entry or DEFAULT_ENTRIES:
+        result = run_benchmark(entry, args.reruns)
+        print(f"== {entry}")
+        if "error" in result:
+            print(f"  error: {result['error'][0]}")
+            failed = True
+            continue
+        for key, limit in limits.items():
+            value = result[key]
+            over = limit is not None and value is not None and value > limit
+            failed = failed or over
+            shown = "-" if value is None else f"{value:.3f}s"
+            print(f"  {key}: {shown}" + (f"  (limit {limit:.3f}s exceeded)" if over else ""))
+        if result["exceptions"]:
+            print(f"  exceptions: {result['exceptions']}")
+            failed = True
+        if result["lazy_modules_loaded"]:
+            print(f"  loaded at startup (should be lazy): {', '.join(result['lazy_modules_loaded'])}")
+            failed = True
+        for cumulative_us, name in _slowest_imports(entry, args.top_imports):
+            print(f"  import {name}: {cumulative_us / 1000:.1f}ms")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,41 +1,208 @@
 import os
+import re
+import json
+import time
+import hashlib
+import shutil
+import tempfile
+import threading
 import traceback
-from openai import OpenAI
-from langchain_openai import ChatOpenAI
+import contextvars
+from collections import deque
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
+from src.artifacts import get_artifact_store
+from src.executors import DATASET_FORMATS, CodeExecutor, LocalExecutor, dataset_variable_name
+from src.tracing import trace_span
 
 load_dotenv()
 
-class CodeInterpreterClient:
+
+class ContainerPool:
     """
-    LangChain ChatOpenAI의 Responses API의 built-in Code Interpreter를 사용하여
-    Python 코드를 실행하거나 파일을 읽고 분석을 수행하는 클래스
+    미리 생성해 둔(warm) Code Interpreter Container를 보관하는 프로세스 공용 풀
 
-    이 클래스는 다음 기능을 제공합니다：
-    1. LangChain ChatOpenAI + Responses API를 사용한 Python 코드 실행
-    2. 파일 업로드 및 Container에 파일 등록
-    3. 업로드한 파일을 사용한 데이터 분석 및 그래프 생성
+    Container 생성은 수 초가 걸리므로 첫 페이지 로드나 "Clear Conversation" 때마다
+    기다리지 않도록, min_size개의 Container를 백그라운드에서 미리 만들어 둡니다.
+    - acquire(): warm Container가 있으면 즉시 반환, 없으면 새로 생성 (cold start)
+    - release(): 사용이 끝난 Container는 다른 세션에 넘기지 않고 삭제
+    - idle_timeout_seconds가 지난 warm Container는 OpenAI 측에서 만료되기 전에 폐기
+    - 백그라운드 thread가 maintenance_interval_seconds마다 오래된 warm Container를 폐기하고 다시 채우므로,
+      요청이 한동안 없다가 다시 들어와도 warm Container를 바로 사용할 수 있음
+    """
 
-    주요 메서드：
-    - upload_file(file_content): 파일을 업로드하여 Container에 등록한다
-    - run(code): LangChain ChatOpenAI의 built-in Code Interpreter를 사용해 Python 코드를 실행한다
+    def __init__(
+        self,
+        name: str = "code-interpreter-session",
+        min_size: int = 2,
+        idle_timeout_seconds: float = 15 * 60,
+        maintenance_interval_seconds: float = 60,
+    ):
+        # OpenAI SDK는 llm 모드에서만 필요하므로 사용할 때 import (direct 모드의 시작 시간 단축)
+        from openai import OpenAI
 
-    LangChain OpenAI Responses API 기반:
-    - ChatOpenAI.bind_tools([{"type": "code_interpreter", ...}])
-    - 서버사이드 코드 실행으로 대폭 간소화
+        self.openai_client = OpenAI()
+        self.name = name
+        self.min_size = min_size
+        self.idle_timeout_seconds = idle_timeout_seconds
+        self.maintenance_interval_seconds = maintenance_interval_seconds
+        self.hits = 0
+        self.cold_starts = 0
+        self.total_wait_seconds = 0.0
+        self._warm = deque()  # (container_id, created_at)
+        self._creating = 0
+        self._lock = threading.Lock()
+        self._closed = threading.Event()
+        self.replenish()
+        threading.Thread(target=self._maintain, daemon=True).start()
 
-    Example:
-    ===============
-    from src.code_interpreter import CodeInterpreterClient
-    code_interpreter = CodeInterpreterClient()
-    code_interpreter.upload_file(open('file.csv', 'rb').read(), 'file.csv')
-    code_interpreter.run("print('hello')")
+    def _create_container(self):
+        """
+        Code Interpreter 실행을 위한 Container를 생성합니다.
+        Container는 코드 실행 환경을 제공하며, 파일도 함께 관리됩니다.
+        """
+        with trace_span("container.create", container_name=self.name):
+            container = self.openai_client.containers.create(name=self.name)
+        return container.id
+
+    def _delete_container(self, container_id):
+        try:
+            self.openai_client.containers.delete(container_id)
+        except Exception as e:
+            print(f"Failed to delete container {container_id}: {e}")
+
+    def _expire_idle(self):
+        """lock을 잡은 상태에서 호출. 오래된 warm Container 목록을 반환"""
+        expired = []
+        now = time.monotonic()
+        while self._warm and now - self._warm[0][1] > self.idle_timeout_seconds:
+            expired.append(self._warm.popleft()[0])
+        return expired
+
+    def _maintain(self):
+        """요청이 없을 때도 오래된 warm Container를 폐기하고 min_size개를 유지"""
+        while not self._closed.wait(self.maintenance_interval_seconds):
+            with self._lock:
+                expired = self._expire_idle()
+            for expired_id in expired:
+                self.release(expired_id)
+            self.replenish()
+
+    def acquire(self):
+        """warm Container를 하나 꺼내 반환 (없으면 새로 생성)"""
+        started_at = time.monotonic()
+        with self._lock:
+            expired = self._expire_idle()
+            container_id = self._warm.popleft()[0] if self._warm else None
+        for expired_id in expired:
+            self.release(expired_id)
+
+        if container_id is None:
+            container_id = self._create_container()
+            cold_start = True
+        else:
+            cold_start = False
+        with self._lock:
+            if cold_start:
+                self.cold_starts += 1
+            else:
+                self.hits += 1
+            self.total_wait_seconds += time.monotonic() - started_at
+        self.replenish()
+        return container_id
+
+    def release(self, container_id):
+        """사용이 끝난 Container를 백그라운드에서 삭제 (세션 간 데이터가 섞이지 않도록 재사용하지 않음)"""
+        threading.Thread(target=self._delete_container, args=(container_id,), daemon=True).start()
+
+    def replenish(self):
+        """warm Container가 min_size개가 되도록 백그라운드에서 생성"""
+        with self._lock:
+            if self._closed.is_set():
+                return
+            pending = len(self._warm) + self._creating
+            shortage = max(self.min_size - pending, 0)
+            self._creating += shortage
+        for _ in range(shortage):
+            threading.Thread(target=self._create_warm_container, daemon=True).start()
+
+    def _create_warm_container(self):
+        try:
+            container_id = self._create_container()
+            with self._lock:
+                self._warm.append((container_id, time.monotonic()))
+        except Exception as e:
+            print(f"Failed to pre-warm container: {e}")
+        finally:
+            with self._lock:
+                self._creating -= 1
+
+    def close(self):
+        """백그라운드 관리를 멈추고 warm Container를 모두 삭제"""
+        self._closed.set()
+        with self._lock:
+            warm = [container_id for container_id, _ in self._warm]
+            self._warm.clear()
+        for container_id in warm:
+            self._delete_container(container_id)
+
+    def stats(self):
+        with self._lock:
+            acquired = self.hits + self.cold_starts
+            return {
+                "warm": len(self._warm),
+                "hits": self.hits,
+                "cold_starts": self.cold_starts,
+                "avg_wait_seconds": self.total_wait_seconds / acquired if acquired else 0.0,
+            }
+
+
+_container_pool = None
+_container_pool_lock = threading.Lock()
+
+
+def get_container_pool():
+    """프로세스 공용 ContainerPool을 반환 (처음 호출될 때 생성)"""
+    global _container_pool
+    with _container_pool_lock:
+        if _container_pool is None:
+            _container_pool = ContainerPool()
+        return _container_pool
+
+
+class ContainerExecutor(CodeExecutor):
     """
+    OpenAI Container에서 LangChain ChatOpenAI의 built-in Code Interpreter로 코드를 실행하는 backend
+    코드를 프롬프트로 감싸 gpt-5-mini가 실행하게 하므로 LLM 호출이 한 번 더 발생함
+    코드가 호스트 밖의 격리된 Container에서 실행되므로 기본 실행 모드로 사용
+
+    업로드한 CSV / Parquet / Arrow 파일은 업로드할 때 한 번 Container의 Python 세션에 DataFrame 변수로 로드함
+    (Container의 변수는 Container가 만료될 때까지 유지됨. Container의 메모리는 OpenAI가 관리하므로
+    LocalExecutor와 달리 메모리 예산에 따른 변수 삭제는 하지 않음)
+    """
+
+    # 로드 결과를 실행 로그에서 찾기 위한 표시
+    DATASET_MARKER = "__dataset_loaded__"
+    DATASET_READERS = {
+        "csv": "pd.read_csv({path!r})",
+        "parquet": "pd.read_parquet({path!r})",
+        "arrow": "pyarrow.ipc.open_file({path!r}).read_pandas()",
+    }
+
+    def __init__(self, container_pool=None):
+        from openai import OpenAI
+        from langchain_openai import ChatOpenAI
 
-    def __init__(self):
         self.openai_client = OpenAI()
-        self.container_id = self._create_container()
-        self._create_file_directory()
+        # Container는 미리 생성해 둔 풀에서 가져옴 (세션 시작 시 생성 대기 없음)
+        self.container_pool = container_pool or get_container_pool()
+        self.container_id = self.container_pool.acquire()
+        # 다운로드한 파일을 ArtifactStore로 옮기기 전에 두는 임시 디렉터리
+        self.download_dir = tempfile.mkdtemp(prefix="code-interpreter-")
+        # Container에 이미 있는 파일 ID (업로드 / 다운로드할 때마다 갱신)
+        # 풀에서 받은 Container는 비어 있으므로 빈 집합에서 시작
+        self._known_file_ids = set()
         # LangChain ChatOpenAI with built-in Code Interpreter (Responses API)
         self.llm = ChatOpenAI(
             model="gpt-5-mini",
@@ -48,41 +215,41 @@ class CodeInterpreterClient:
             }
         ])
 
-    def _create_file_directory(self):
-        directory = "./files/"
-        os.makedirs(directory, exist_ok=True)
-
-    def _create_container(self):
-        """
-        Code Interpreter 실행을 위한 Container를 생성합니다.
-        Container는 코드 실행 환경을 제공하며, 파일도 함께 관리됩니다.
-        """
-        container = self.openai_client.containers.create(
-            name="code-interpreter-session"
-        )
-        return container.id
-
-    def upload_file(self, file_content, filename="uploaded_file.csv"):
+    def upload_file(self, file_content, filename):
         # Container에 파일 직접 업로드 (Responses API 방식)
-        response = self.openai_client.containers.files.create(
-            container_id=self.container_id,
-            file=(filename, file_content),
-        )
+        # file_content는 bytes 또는 읽기 가능한 파일 객체 (대용량 결과는 파일 객체로 스트리밍)
+        with trace_span("container.files.create", container_id=self.container_id, filename=filename):
+            response = self.openai_client.containers.files.create(
+                container_id=self.container_id,
+                file=(filename, file_content),
+            )
+        self._known_file_ids.add(response.id)
         return filename, response.path
 
-    def run(self, code):
-        """
-        LangChain ChatOpenAI의 built-in Code Interpreter를 사용하여
-        Python 코드를 실행합니다.
-
-        Args:
-            code: 실행할 Python 코드 문자열
+    def load_dataset(self, filename, path):
+        file_format = DATASET_FORMATS.get(os.path.splitext(filename)[1].lower())
+        if file_format is None:
+            return None
+        name = dataset_variable_name(filename)
+        code = (
+            "import json\n"
+            "import pandas as pd\n"
+            "import pyarrow.ipc\n"
+            f"{name} = {self.DATASET_READERS[file_format].format(path=path)}\n"
+            f"print({self.DATASET_MARKER!r}, json.dumps({{'rows': len({name}), "
+            f"'columns': [str(c) for c in {name}.columns]}}))\n"
+        )
+        with trace_span("container.load_dataset", variable=name, format=file_format):
+            output, _ = self.run(code)
+        # 로드에 실패하면 변수 안내 없이 파일 경로만 알려줌 (코드에서 직접 읽음)
+        match = re.search(rf"{self.DATASET_MARKER} (\{{.*\}})", output)
+        if match is None:
+            print(f"Dataset preload failed for {filename}: {output[:200]}")
+            return None
+        result = json.loads(match.group(1))
+        return {"name": name, "rows": result["rows"], "columns": result["columns"]}
 
-        Returns:
-            tuple: (text_content, file_names)
-                - text_content: 코드 실행 결과 텍스트
-                - file_names: 생성된 파일 경로 리스트
-        """
+    def run(self, code):
         prompt = f"""다음 코드를 실행하고 결과를 반환해 주세요.
 파일 읽기에 실패한 경우, 가능한 범위 내에서 수정하고 다시 실행해 주세요.
 
@@ -91,57 +258,280 @@ class CodeInterpreterClient:
 ```
 """
         try:
-            before_file_ids = self._list_container_file_ids()
-            response = self.llm.invoke(prompt)
+            # Container 시각은 초 단위이므로 내림하여 비교
+            started_at = int(time.time())
+            with trace_span("container.llm_invoke", container_id=self.container_id):
+                response = self.llm.invoke(prompt)
             text_parts = []
+            cited_files = {}
             for block in response.content:
-                if isinstance(block, dict) and block.get("type") == "code_interpreter_call":
+                if not isinstance(block, dict):
+                    continue
+                if block.get("type") == "code_interpreter_call":
                     for item in block.get("outputs", []):
                         if isinstance(item, dict):
                             logs = item.get("logs", "")
                             if logs:
                                 text_parts.append(logs)
+                # 응답 텍스트의 container_file_citation에서 생성된 파일을 바로 확인
+                for annotation in block.get("annotations", []):
+                    if isinstance(annotation, dict) and annotation.get("type") == "container_file_citation":
+                        cited_files[annotation["file_id"]] = annotation.get("filename")
 
             output = "\n".join(text_parts).strip()
-            file_names = self._download_files(before_file_ids)
+            file_paths = self._download_files(self._find_new_files(cited_files, started_at))
 
-            return output, file_names
+            return output, file_paths
 
         except Exception as e:
             error_msg = f"[Code Interpreter 오류]\n{traceback.format_exc()}"
             return error_msg, []
 
-    def _list_container_file_ids(self):
-        """현재 Container에 존재하는 파일 ID 목록을 반환합니다."""
-        file_ids = set()
-        result = self.openai_client.containers.files.list(container_id=self.container_id)
-        for f in result.data:
-            file_ids.add(f.id)
-
-        return file_ids
-
-    def _download_files(self, before_file_ids):
-        """실행 전후 Container 파일 목록을 비교하여 새로 생긴 파일을 다운로드합니다."""
-        after_file_ids = self._list_container_file_ids()
-        new_file_ids = after_file_ids - before_file_ids
-        print(f"New file IDs: {new_file_ids}")
+    def close(self):
+        """사용이 끝난 Container를 풀에 반납 (삭제됨)"""
+        self.container_pool.release(self.container_id)
+        shutil.rmtree(self.download_dir, ignore_errors=True)
 
-        file_paths = []
-        for file_id in new_file_ids:
-            file_info = self.openai_client.containers.files.retrieve(
-                file_id=file_id,
-                container_id=self.container_id,
+    def _find_new_files(self, cited_files, started_at):
+        """
+        새로 생성된 파일의 {file_id: filename}을 반환합니다.
+        모델이 응답에서 인용하지 않은 파일(두 번째 그래프 등)도 놓치지 않도록, 인용된 파일에 더해
+        최신 파일부터 이미 알고 있는 파일이나 실행 시작 전에 생성된 파일이 나올 때까지 목록을 조회합니다
+        (전체 목록 조회 없음). 인용된 파일은 파일명을 이미 알고 있으므로 retrieve 호출을 생략합니다.
+        """
+        new_files = {
+            file_id: filename
+            for file_id, filename in cited_files.items()
+            if file_id not in self._known_file_ids
+        }
+        with trace_span("container.files.list", container_id=self.container_id):
+            result = self.openai_client.containers.files.list(
+                container_id=self.container_id, order="desc", limit=20
             )
-            original_filename = os.path.basename(getattr(file_info, "path", None))
+        for f in result.data:
+            if f.id in self._known_file_ids or f.created_at < started_at:
+                break
+            new_files.setdefault(f.id, os.path.basename(f.path))
+        return new_files
 
+    def _download_file(self, file_id, filename):
+        with trace_span("container.files.download", container_id=self.container_id, file_id=file_id):
+            if not filename:
+                file_info = self.openai_client.containers.files.retrieve(
+                    file_id=file_id,
+                    container_id=self.container_id,
+                )
+                filename = os.path.basename(file_info.path)
             content = self.openai_client.containers.files.content.retrieve(
                 file_id=file_id,
                 container_id=self.container_id,
             )
-            file_name = f"./files/{original_filename}"
+            file_name = os.path.join(self.download_dir, os.path.basename(filename))
             with open(file_name, "wb") as f:
                 f.write(content.read())
                 print(f"Downloaded file: {file_name}")
+        return file_name
+
+    def _download_files(self, new_files):
+        """새로 생긴 파일을 동시에 다운로드합니다."""
+        print(f"New file IDs: {set(new_files)}")
+        self._known_file_ids.update(new_files)
+        if not new_files:
+            return []
+        # 다운로드 span이 현재 tool 호출 span 아래에 기록되도록 thread마다 context를 복사해서 실행
+        with ThreadPoolExecutor(max_workers=min(len(new_files), 8)) as executor:
+            futures = [
+                executor.submit(contextvars.copy_context().run, self._download_file, file_id, filename)
+                for file_id, filename in new_files.items()
+            ]
+            return [future.result() for future in futures]
+
+
+def content_digest(file_content, chunk_size=1024 * 1024):
+    """
+    업로드할 내용의 sha256
+    파일 객체는 chunk 단위로 읽어 해시를 계산한 뒤 원래 위치로 되돌림 (내용 전체를 메모리에 복사하지 않음)
+    """
+    digest = hashlib.sha256()
+    if isinstance(file_content, (bytes, bytearray, memoryview)):
+        digest.update(file_content)
+    else:
+        start = file_content.tell()
+        for chunk in iter(lambda: file_content.read(chunk_size), b""):
+            digest.update(chunk)
+        file_content.seek(start)
+    return digest.hexdigest()
+
+
+def content_addressed_name(filename, digest):
+    """내용이 다르면 이름도 달라지도록 파일명에 해시를 붙임 (예: query_result.parquet -> query_result-1a2b3c4d5e.parquet)"""
+    stem, extension = os.path.splitext(os.path.basename(filename))
+    return f"{stem}-{digest[:10]}{extension}"
+
+
+class CodeInterpreterClient:
+    """
+    Python 코드를 실행하거나 파일을 읽고 분석을 수행하는 클래스
+
+    이 클래스는 다음 기능을 제공합니다：
+    1. Python 코드 실행 (실행 backend는 CodeExecutor로 교체 가능)
+    2. 파일 업로드 및 실행 환경에 파일 등록
+    3. 업로드한 파일을 사용한 데이터 분석 및 그래프 생성
+
+    실행 모드 (execution_mode, 기본값은 환경 변수 CODE_INTERPRETER_MODE 또는 "llm")：
+    - "llm": ContainerExecutor - 코드를 프롬프트로 감싸 gpt-5-mini의 Code Interpreter로 실행한다 (격리된 OpenAI Container)
+    - "direct": LocalExecutor - 코드를 LLM을 거치지 않고 로컬 kernel에서 그대로 실행한다 (opt-in)
+      worker는 앱과 같은 사용자로 실행되며 rlimit 외의 격리(seccomp / namespace)가 없으므로
+      네트워크와 앱의 파일(.streamlit/secrets.toml, .env 등)에 접근할 수 있습니다.
+      LLM이 작성한 코드를 신뢰할 수 있는 환경(로컬 개발, benchmark)에서만 사용하세요.
+    실행 환경(Container / kernel)은 처음 사용할 때 만듭니다 (페이지를 열기만 했을 때는 만들지 않음).
+
+    주요 메서드：
+    - upload_file(file_content): 파일을 업로드하여 실행 환경에 등록한다 (표 형식 파일은 DataFrame 변수로 미리 로드)
+      내용의 해시로 파일명을 정하고, 같은 내용이 이미 있으면 다시 전송하지 않는다
+    - describe_dataset(filename): 미리 로드된 DataFrame 변수를 설명하는 문구를 반환한다
+    - close(): 진행 중인 업로드 / 실행이 끝나기를 기다린 뒤 로컬 kernel을 종료하거나 Container를 ContainerPool에 반납한다
+    - is_busy(): 업로드 / 실행 중인지 반환한다 (registry는 실행 중인 세션을 종료하지 않음)
+    - take_reset_notice(): 이전 실행 환경이 종료된 뒤 새로 만든 client이면, 처음 한 번만 agent에게 알릴 문구를 반환한다
+    - run(code): Python 코드를 실행한다
+
+    Example:
+    ===============
+    from src.code_interpreter import CodeInterpreterClient
+    code_interpreter = CodeInterpreterClient()
+    code_interpreter.upload_file(open('file.csv', 'rb').read(), 'file.csv')
+    code_interpreter.run("print('hello')")
+    """
+
+    def __init__(self, session_id=None, execution_mode=None, executor=None):
+        # 생성한 파일을 ArtifactStore의 세션 디렉터리에 저장하기 위한 ID (registry가 thread_id를 전달)
+        self.session_id = session_id or f"session-{time.time_ns()}"
+        self.artifact_store = get_artifact_store()
+        self.execution_mode = execution_mode or os.getenv("CODE_INTERPRETER_MODE", "llm")
+        if self.execution_mode not in ("direct", "llm"):
+            raise ValueError(f"Unknown execution mode: {self.execution_mode}")
+        # 업로드 파일명 -> 미리 로드된 DataFrame 변수 정보
+        self.datasets = {}
+        # 실행 환경에 이미 있는 파일의 manifest (내용 해시 -> (파일명, 실행 환경의 경로))
+        self.uploads = {}
+        # 세션의 실행 환경(kernel / Container)은 변수와 파일을 공유하므로 한 번에 하나의 작업만 실행
+        # (모델이 여러 tool을 동시에 호출해도 실행 순서가 섞이지 않고, Container 사용량도 세션당 1개로 제한됨)
+        self._session_lock = threading.Lock()
+        self._executor = executor
+        self._executor_lock = threading.Lock()
+        # 진행 중인 업로드 / 실행 수. close()는 0이 될 때까지 기다림
+        self._in_flight = 0
+        self._closed = False
+        self._idle = threading.Condition()
+        # registry가 이 세션의 이전 client를 종료(유휴 시간 초과 등)한 뒤 다시 만든 경우 그 이유
+        self.reset_reason = None
+        self._reset_notified = False
+
+    @property
+    def executor(self):
+        """실행 환경은 처음 사용할 때 생성 (llm 모드의 openai SDK import와 Container 할당도 이때 발생)"""
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = LocalExecutor() if self.execution_mode == "direct" else ContainerExecutor()
+            return self._executor
+
+    @property
+    def container_pool(self):
+        """Container를 사용 중이면 ContainerPool, 아니면 (아직 실행 환경을 만들지 않은 경우 포함) None"""
+        return self._executor.container_pool if self._executor is not None else None
+
+    def close(self):
+        with self._idle:
+            self._closed = True
+            self._idle.wait_for(lambda: self._in_flight == 0)
+        with self._executor_lock:
+            if self._executor is not None:
+                self._executor.close()
+
+    def is_busy(self):
+        with self._idle:
+            return self._in_flight > 0
+
+    @contextmanager
+    def _in_use(self):
+        with self._idle:
+            if self._closed:
+                raise RuntimeError(f"Code Interpreter session {self.session_id} was closed")
+            self._in_flight += 1
+        try:
+            yield
+        finally:
+            with self._idle:
+                self._in_flight -= 1
+                self._idle.notify_all()
+
+    def take_reset_notice(self):
+        """이전 실행 환경이 종료되어 새로 만든 client이면 처음 한 번만 agent에게 알릴 문구를 반환 (아니면 빈 문자열)"""
+        with self._idle:
+            if self.reset_reason is None or self._reset_notified:
+                return ""
+            self._reset_notified = True
+        return (
+            f"[알림] {self.reset_reason} 이전 Code Interpreter 실행 환경이 종료되어 새로 시작했습니다. "
+            "이전에 업로드한 파일, 쿼리 결과 파일, 변수(df_* 등)는 더 이상 없으므로 "
+            "필요하면 쿼리를 다시 실행하거나 사용자에게 파일을 다시 업로드해 달라고 요청하세요.\n"
+        )
 
-            file_paths.append(file_name)
-        return file_paths
+    def upload_file(self, file_content, filename="uploaded_file.csv"):
+        """
+        파일을 실행 환경에 업로드하고 (파일명, 실행 환경의 경로)를 반환합니다
+        파일명은 내용의 해시를 붙인 이름으로 바뀌며, 같은 내용을 다시 업로드하면 전송하지 않고
+        이전에 업로드한 파일명과 경로를 반환합니다
+        file_content는 bytes 또는 읽기 가능한 파일 객체 (대용량 파일은 파일 객체로 전달)
+        """
+        with self._in_use(), trace_span("code_interpreter.upload", filename=filename) as span:
+            digest = content_digest(file_content)
+            with self._session_lock:
+                if digest in self.uploads:
+                    print(f"[upload] skipped duplicate content: {self.uploads[digest][0]}")
+                    span.set_attribute("deduplicated", True)
+                    return self.uploads[digest]
+                filename, file_path = self.executor.upload_file(
+                    file_content, content_addressed_name(filename, digest)
+                )
+                self.uploads[digest] = (filename, file_path)
+                # 표 형식 파일은 실행 환경에 DataFrame 변수로 미리 로드 (코드마다 다시 읽지 않도록)
+                dataset = self.executor.load_dataset(filename, file_path)
+                if dataset is not None:
+                    self.datasets[filename] = dataset
+        return filename, file_path
+
+    def describe_dataset(self, filename):
+        """미리 로드된 DataFrame 변수를 에이전트에게 알려주기 위한 문구 (없으면 빈 문자열)"""
+        dataset = self.datasets.get(filename)
+        if dataset is None:
+            return ""
+        return (
+            f"이미 DataFrame 변수 `{dataset['name']}`로 로드되어 있습니다 "
+            f"({dataset['rows']} rows, columns: {', '.join(dataset['columns'])}). "
+            "파일을 다시 읽지 말고 이 변수를 사용하세요."
+        )
+
+    def run(self, code, turn=None):
+        """
+        Python 코드를 실행합니다.
+
+        Args:
+            code: 실행할 Python 코드 문자열
+            turn: 대화의 몇 번째 turn에서 실행했는지 (ArtifactStore index에 기록)
+
+        Returns:
+            tuple: (text_content, file_names)
+                - text_content: 코드 실행 결과 텍스트
+                - file_names: 생성된 파일의 ArtifactStore 경로 리스트 (./files/<session_id>/...)
+        """
+        with self._in_use(), trace_span("code_interpreter.run", mode=self.execution_mode, turn=turn) as span:
+            # lock 대기 시간도 span에 포함 (같은 세션의 다른 실행이 끝나기를 기다린 시간)
+            with self._session_lock:
+                text_content, file_paths = self.executor.run(code)
+            with trace_span("artifacts.put", files=len(file_paths)):
+                file_names = [
+                    self.artifact_store.put(self.session_id, path, turn=turn) for path in file_paths
+                ]
+            span.set_attribute("files", len(file_names))
+        return text_content, file_names
@@ -0,0 +1,140 @@
+"""
+대화 context 압축 middleware
+
+checkpointer가 이전 대화를 모두 model 호출에 다시 넣기 때문에, 세션이 길어질수록
+이전 SQL 결과나 코드 실행 로그가 prompt에 계속 쌓여 지연 시간과 token 비용이 늘어납니다.
+ContextCompactionMiddleware는 model을 호출하기 직전에만 messages를 줄이며,
+checkpointer에 저장된 대화 기록은 그대로 둡니다.
+1. 이전 turn의 tool 결과는 앞부분 미리보기와 참조 파일 경로만 남김
+   (실행한 SQL과 코드는 AIMessage의 tool_calls에 남아 있으므로 그대로 참조 가능)
+2. 그래도 token 예산을 넘으면 현재 turn의 오래된 tool 결과도 같은 방식으로 줄임
+3. 그래도 넘으면 가장 오래된 turn부터 제외
+"""
+import re
+import threading
+from collections import deque
+
+from langchain.agents.middleware import AgentMiddleware
+from langchain_core.messages import HumanMessage, SystemMessage, ToolMessage
+from langchain_core.messages.utils import count_tokens_approximately
+
+# tool 결과에서 파일 참조를 찾기 위한 패턴 (업로드한 데이터, 쿼리 결과, 생성한 이미지 등)
+_FILE_REFERENCE_PATTERN = re.compile(
+    r"[\w./:-]+\.(?:csv|parquet|arrow|png|jpe?g|svg|json|xlsx)\b", re.IGNORECASE
+)
+
+
+class ContextCompactionMiddleware(AgentMiddleware):
+    def __init__(
+        self,
+        max_input_tokens=32_000,
+        keep_recent_tool_results=3,
+        tool_preview_chars=300,
+        history_size=50,
+    ):
+        super().__init__()
+        self.max_input_tokens = max_input_tokens
+        self.keep_recent_tool_results = keep_recent_tool_results
+        self.tool_preview_chars = tool_preview_chars
+        self._lock = threading.Lock()
+        # model 호출별 prompt 크기 (original_tokens: 압축 전, input_tokens: 실제로 보낸 크기)
+        self.history = deque(maxlen=history_size)
+
+    def _count_tokens(self, system_prompt, messages):
+        system = [SystemMessage(content=system_prompt)] if system_prompt else []
+        return count_tokens_approximately(system + list(messages))
+
+    def _compact_tool_message(self, message):
+        content = message.content
+        if not isinstance(content, str) or len(content) <= self.tool_preview_chars:
+            return message
+        references = sorted(set(_FILE_REFERENCE_PATTERN.findall(content)))
+        summary = (
+            f"[이전 tool 결과를 줄였습니다. 원래 {len(content):,}자]\n"
+            f"{content[:self.tool_preview_chars]} ..."
+        )
+        if references:
+            summary += "\n참조 파일: " + ", ".join(references)
+        return message.model_copy(update={"content": summary, "artifact": None})
+
+    def _compact_tool_messages(self, messages, indices):
+        compacted = 0
+        for i in indices:
+            compact = self._compact_tool_message(messages[i])
+            if compact is not messages[i]:
+                messages[i] = compact
+                compacted += 1
+        return compacted
+
+    def compact(self, system_prompt, messages):
+        """
+        model에 보낼 messages를 줄여서 (messages, metrics)를 반환합니다
+        원본 messages 리스트는 변경하지 않습니다
+        """
+        messages = list(messages)
+        original_tokens = self._count_tokens(system_prompt, messages)
+        human_indices = [i for i, m in enumerate(messages) if isinstance(m, HumanMessage)]
+        current_turn_start = human_indices[-1] if human_indices else 0
+        tool_indices = [i for i, m in enumerate(messages) if isinstance(m, ToolMessage)]
+
+        # 1. 이전 turn의 tool 결과
+        compacted = self._compact_tool_messages(
+            messages, [i for i in tool_indices if i < current_turn_start]
+        )
+        tokens = self._count_tokens(system_prompt, messages)
+
+        # 2. 현재 turn의 tool 결과 중 최근 결과를 제외한 나머지
+        if tokens > self.max_input_tokens:
+            current = [i for i in tool_indices if i >= current_turn_start]
+            older = current[: -self.keep_recent_tool_results] if self.keep_recent_tool_results else current
+            compacted += self._compact_tool_messages(messages, older)
+            tokens = self._count_tokens(system_prompt, messages)
+
+        # 3. 오래된 turn부터 제외 (tool_call과 tool 결과의 짝이 깨지지 않도록 turn 단위로 제외)
+        dropped = 0
+        while tokens > self.max_input_tokens:
+            human_indices = [i for i, m in enumerate(messages) if isinstance(m, HumanMessage)]
+            if len(human_indices) < 2:
+                break
+            dropped += human_indices[1]
+            messages = messages[human_indices[1]:]
+            tokens = self._count_tokens(system_prompt, messages)
+
+        metrics = {
+            "original_tokens": original_tokens,
+            "input_tokens": tokens,
+            "messages": len(messages),
+            "compacted_tool_results": compacted,
+            "dropped_messages": dropped,
+        }
+        return messages, metrics
+
+    def _prepare(self, request):
+        messages, metrics = self.compact(request.system_prompt, request.messages)
+        with self._lock:
+            self.history.append(metrics)
+        print(
+            f"[context] prompt ~{metrics['input_tokens']:,} tokens "
+            f"(before compaction ~{metrics['original_tokens']:,}), "
+            f"{metrics['compacted_tool_results']} tool results compacted, "
+            f"{metrics['dropped_messages']} messages dropped"
+        )
+        return request.override(messages=messages)
+
+    def wrap_model_call(self, request, handler):
+        return handler(self._prepare(request))
+
+    async def awrap_model_call(self, request, handler):
+        return await handler(self._prepare(request))
+
+    def stats(self):
+        with self._lock:
+            history = list(self.history)
+        if not history:
+            return {"calls": 0, "last_input_tokens": 0, "last_original_tokens": 0, "max_input_tokens": 0}
+        return {
+            "calls": len(history),
+            "last_input_tokens": history[-1]["input_tokens"],
+            "last_original_tokens": history[-1]["original_tokens"],
+            "max_input_tokens": max(m["input_tokens"] for m in history),
+        }
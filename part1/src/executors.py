@@ -0,0 +1,398 @@
+import os
+import re
+import sys
+import json
+import time
+import select
+import shutil
+import threading
+import traceback
+import subprocess
+from collections import OrderedDict, deque
+
+from src.tracing import trace_span
+
+
+class CodeExecutor:
+    """
+    CodeInterpreterClient가 사용하는 코드 실행 backend 인터페이스
+
+    구현 클래스：
+    - LocalExecutor: 로컬 worker 프로세스에서 코드를 그대로 실행 (네트워크 불필요, rlimit 외의 격리 없음)
+    - ContainerExecutor (src.code_interpreter): OpenAI Container + Code Interpreter로 실행
+    """
+
+    # Container를 사용하는 backend만 ContainerPool을 가짐
+    container_pool = None
+
+    def upload_file(self, file_content, filename):
+        """
+        파일을 실행 환경에 올리고 (filename, 실행 환경에서의 경로)를 반환
+        file_content는 bytes 또는 읽기 가능한 파일 객체
+        """
+        raise NotImplementedError
+
+    def run(self, code):
+        """
+        Returns:
+            tuple: (text_content, file_paths)
+                - file_paths: 코드가 생성한 파일의 로컬 경로 (CodeInterpreterClient가 ArtifactStore로 복사)
+        """
+        raise NotImplementedError
+
+    def load_dataset(self, filename, path):
+        """
+        업로드한 표 형식 파일을 실행 환경에 DataFrame 변수로 미리 로드
+        지원하지 않는 backend / 파일 형식이면 None, 로드하면 {"name", "rows", "columns"}를 반환
+        """
+        return None
+
+    def close(self):
+        pass
+
+
+# worker 프로세스에 넘기지 않을 환경 변수 (API 키 등)
+_SECRET_ENV_SUFFIXES = ("_KEY", "_TOKEN", "_SECRET", "_CREDENTIALS", "_PASSWORD")
+
+
+def _worker_env():
+    env = {
+        key: value
+        for key, value in os.environ.items()
+        if not key.upper().endswith(_SECRET_ENV_SUFFIXES)
+    }
+    env["MPLBACKEND"] = "Agg"
+    return env
+
+
+class LocalKernel:
+    """
+    kernel_worker.py를 subprocess로 실행하여 Python 코드를 그대로(verbatim) 실행하는 로컬 kernel
+
+    - 생성 즉시 worker를 시작하며, worker는 pandas / matplotlib 등을 미리 import해 둠
+    - attach(work_dir)로 세션의 작업 디렉터리에 연결한 뒤 execute(code)로 실행
+    - worker 프로세스는 세션 동안 유지되므로 Jupyter kernel처럼 변수가 유지됨
+    - 메모리 / 파일 크기 / 열린 파일 수는 worker가 시작할 때 스스로 rlimit으로 제한
+      (자원 사용량 제한일 뿐 보안 격리가 아님. seccomp / namespace / 별도 uid는 적용하지 않으므로
+      worker는 앱과 같은 사용자 권한으로 네트워크와 파일에 접근할 수 있음)
+    - 제한 시간을 넘기면 worker를 종료하고, 다음 실행 때 새 worker를 시작함
+    """
+
+    WORKER_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "kernel_worker.py")
+
+    def __init__(
+        self,
+        timeout_seconds=120,
+        memory_limit_bytes=4 * 1024**3,
+        file_size_limit_bytes=1024**3,
+    ):
+        self.timeout_seconds = timeout_seconds
+        self.memory_limit_bytes = memory_limit_bytes
+        self.file_size_limit_bytes = file_size_limit_bytes
+        self.work_dir = None
+        # worker를 (다시) 시작할 때마다 증가. 바뀌면 이전 변수는 모두 사라진 것
+        self.generation = 0
+        self._process = None
+        self._lock = threading.Lock()
+        self._start()
+
+    def _start(self):
+        # preexec_fn은 thread가 여러 개인 프로세스(KernelPool의 warm-up thread, Streamlit)에서
+        # fork 후 deadlock을 일으킬 수 있으므로, rlimit은 인자로 넘겨 worker가 직접 적용
+        self._process = subprocess.Popen(
+            [
+                sys.executable, "-u", self.WORKER_PATH,
+                "--memory-limit-bytes", str(self.memory_limit_bytes),
+                "--file-size-limit-bytes", str(self.file_size_limit_bytes),
+            ],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            env=_worker_env(),
+            start_new_session=True,
+        )
+        # 응답은 os.read로 직접 읽어 줄 단위로 나눔 (버퍼가 있는 readline과 select를 함께 쓰면
+        # 버퍼에 남은 응답을 select가 보지 못함)
+        self._buffer = b""
+        self.generation += 1
+        if self.work_dir is not None:
+            self._request({"op": "attach", "work_dir": self.work_dir}, self.timeout_seconds)
+
+    def is_alive(self):
+        return self._process is not None and self._process.poll() is None
+
+    def _request(self, message, timeout):
+        """
+        worker에 요청을 보내고 응답을 반환
+        시간 안에 응답이 없거나 응답을 읽을 수 없으면 worker를 종료하고 None을 반환 (다음 요청 때 다시 시작)
+        """
+        if self._process is None:
+            return None
+        try:
+            self._process.stdin.write((json.dumps(message) + "\n").encode("utf-8"))
+            self._process.stdin.flush()
+            line = self._read_line(timeout)
+            if line is not None:
+                return json.loads(line)
+        except (OSError, ValueError) as e:
+            print(f"Kernel protocol error, restarting kernel: {type(e).__name__}: {e}")
+        self._kill()
+        return None
+
+    def _read_line(self, timeout):
+        """응답 한 줄을 읽음 (시간 안에 줄이 끝나지 않거나 worker가 종료되면 None)"""
+        deadline = time.monotonic() + timeout
+        fd = self._process.stdout.fileno()
+        while b"\n" not in self._buffer:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or not select.select([fd], [], [], remaining)[0]:
+                return None
+            chunk = os.read(fd, 1024 * 1024)
+            if not chunk:
+                return None
+            self._buffer += chunk
+        line, self._buffer = self._buffer.split(b"\n", 1)
+        return line.decode("utf-8")
+
+    def attach(self, work_dir):
+        """세션의 작업 디렉터리로 이동 (상대 경로 ./files/ 등은 이 디렉터리 기준)"""
+        with self._lock:
+            self.work_dir = work_dir
+            if not self.is_alive():
+                self._start()
+            else:
+                self._request({"op": "attach", "work_dir": work_dir}, self.timeout_seconds)
+
+    def call(self, message):
+        """worker에 요청을 보내고 응답을 반환 (시간 안에 응답이 없으면 worker를 종료하고 None)"""
+        with self._lock:
+            if not self.is_alive():
+                self._start()
+            return self._request(message, self.timeout_seconds)
+
+    def execute(self, code):
+        """
+        Returns:
+            tuple: (stdout, stderr)
+        """
+        result = self.call({"op": "exec", "code": code})
+        if result is None:
+            return "", (
+                f"TimeoutError: 코드 실행이 {self.timeout_seconds}초 안에 끝나지 않았거나 "
+                "kernel이 종료되었습니다 (또는 kernel의 응답을 읽을 수 없었습니다). "
+                "kernel을 다시 시작하므로 이전 변수는 사라졌습니다."
+            )
+        return result["stdout"], result["stderr"]
+
+    def _kill(self):
+        if self._process is not None:
+            self._process.kill()
+            self._process.wait()
+            self._process = None
+
+    def close(self):
+        with self._lock:
+            self._kill()
+
+
+class KernelPool:
+    """
+    미리 시작해 둔(pre-forked) LocalKernel을 보관하는 프로세스 공용 풀
+
+    worker 시작과 pandas / matplotlib import에는 수 초가 걸리므로 size개의 kernel을
+    백그라운드에서 미리 준비해 두고, 세션이 시작되면 즉시 하나를 넘겨줍니다.
+    사용이 끝난 kernel은 다른 세션의 변수가 남지 않도록 재사용하지 않고 종료합니다.
+    """
+
+    def __init__(self, size=2, **kernel_options):
+        self.size = size
+        self.kernel_options = kernel_options
+        self.hits = 0
+        self.cold_starts = 0
+        self._warm = deque()
+        self._starting = 0
+        self._lock = threading.Lock()
+        self.replenish()
+
+    def acquire(self, work_dir):
+        with self._lock:
+            kernel = None
+            while self._warm and kernel is None:
+                candidate = self._warm.popleft()
+                if candidate.is_alive():
+                    kernel = candidate
+            if kernel is None:
+                self.cold_starts += 1
+            else:
+                self.hits += 1
+        if kernel is None:
+            kernel = LocalKernel(**self.kernel_options)
+        kernel.attach(work_dir)
+        self.replenish()
+        return kernel
+
+    def replenish(self):
+        with self._lock:
+            shortage = max(self.size - len(self._warm) - self._starting, 0)
+            self._starting += shortage
+        for _ in range(shortage):
+            threading.Thread(target=self._start_warm_kernel, daemon=True).start()
+
+    def _start_warm_kernel(self):
+        try:
+            kernel = LocalKernel(**self.kernel_options)
+            with self._lock:
+                self._warm.append(kernel)
+        except Exception as e:
+            print(f"Failed to pre-start kernel: {e}")
+        finally:
+            with self._lock:
+                self._starting -= 1
+
+    def stats(self):
+        with self._lock:
+            return {"warm": len(self._warm), "hits": self.hits, "cold_starts": self.cold_starts}
+
+
+_kernel_pool = None
+_kernel_pool_lock = threading.Lock()
+
+
+def get_kernel_pool():
+    """프로세스 공용 KernelPool을 반환 (처음 호출될 때 생성)"""
+    global _kernel_pool
+    with _kernel_pool_lock:
+        if _kernel_pool is None:
+            _kernel_pool = KernelPool()
+        return _kernel_pool
+
+
+# 미리 로드할 수 있는 파일 확장자 -> kernel_worker의 format
+DATASET_FORMATS = {".csv": "csv", ".parquet": "parquet", ".arrow": "arrow"}
+
+
+def dataset_variable_name(filename):
+    """파일명으로 DataFrame 변수명을 만듦 (예: query_result.parquet -> df_query_result)"""
+    stem = os.path.splitext(os.path.basename(filename))[0]
+    return "df_" + re.sub(r"\W", "_", stem).lower()
+
+
+class LocalExecutor(CodeExecutor):
+    """
+    로컬 kernel에서 코드를 그대로 실행하는 backend
+
+    세션마다 data_root 아래에 작업 디렉터리를 만들고
+    - uploads/: 업로드한 파일 / BigQuery 결과 (호스트 밖으로 나가지 않음)
+    - files/: 코드가 생성한 파일 (실행 후 ArtifactStore로 복사)
+    를 둡니다.
+
+    업로드한 CSV / Parquet / Arrow 파일은 kernel에 DataFrame 변수로 한 번만 로드해 두고,
+    로드한 데이터의 메모리 합계가 dataset_memory_budget_bytes를 넘으면 가장 오래 사용하지 않은
+    변수부터 kernel에서 삭제합니다. 삭제된 변수는 코드에서 다시 참조할 때 자동으로 다시 로드됩니다.
+    """
+
+    def __init__(self, kernel_pool=None, data_root=None, dataset_memory_budget_bytes=1024**3):
+        data_root = data_root or os.getenv("CODE_INTERPRETER_DATA_DIR", "./sandbox/")
+        os.makedirs(data_root, exist_ok=True)
+        self.work_dir = os.path.abspath(
+            os.path.join(data_root, f"session-{time.time_ns()}-{os.getpid()}")
+        )
+        os.makedirs(os.path.join(self.work_dir, "uploads"))
+        os.makedirs(os.path.join(self.work_dir, "files"))
+        self.kernel = (kernel_pool or get_kernel_pool()).acquire(self.work_dir)
+        self.dataset_memory_budget_bytes = dataset_memory_budget_bytes
+        # 변수명 -> {"path", "format", "memory_bytes", "loaded"} (오래 사용하지 않은 순)
+        self.datasets = OrderedDict()
+        self._datasets_generation = self.kernel.generation
+
+    def upload_file(self, file_content, filename):
+        file_path = os.path.join(self.work_dir, "uploads", filename)
+        with open(file_path, "wb") as f:
+            if isinstance(file_content, bytes):
+                f.write(file_content)
+            else:
+                shutil.copyfileobj(file_content, f)
+        return filename, file_path
+
+    def load_dataset(self, filename, path):
+        file_format = DATASET_FORMATS.get(os.path.splitext(filename)[1].lower())
+        if file_format is None:
+            return None
+        name = dataset_variable_name(filename)
+        self.datasets[name] = {"path": path, "format": file_format, "memory_bytes": 0, "loaded": False}
+        result = self._load(name)
+        if result is None or not result["ok"]:
+            del self.datasets[name]
+            return None
+        return {"name": name, "rows": result["rows"], "columns": result["columns"]}
+
+    def _load(self, name):
+        dataset = self.datasets[name]
+        with trace_span("kernel.load_dataset", variable=name, format=dataset["format"]):
+            result = self.kernel.call(
+                {"op": "load", "name": name, "path": dataset["path"], "format": dataset["format"]}
+            )
+        if result is not None and result["ok"]:
+            dataset.update(memory_bytes=result["memory_bytes"], loaded=True)
+            self.datasets.move_to_end(name)
+            self._evict_idle(keep=name)
+        return result
+
+    def _evict_idle(self, keep):
+        """메모리 예산을 넘으면 오래 사용하지 않은 DataFrame 변수부터 삭제"""
+        loaded = [name for name, dataset in self.datasets.items() if dataset["loaded"]]
+        total = sum(self.datasets[name]["memory_bytes"] for name in loaded)
+        for name in loaded:
+            if total <= self.dataset_memory_budget_bytes:
+                break
+            if name == keep:
+                continue
+            self.kernel.call({"op": "evict", "name": name})
+            self.datasets[name]["loaded"] = False
+            total -= self.datasets[name]["memory_bytes"]
+
+    def _prepare_datasets(self, code):
+        """코드가 참조하는 DataFrame 변수를 최근 사용으로 표시하고, 삭제된 변수는 다시 로드"""
+        if self._datasets_generation != self.kernel.generation:
+            # kernel이 재시작되어 변수가 모두 사라짐
+            for dataset in self.datasets.values():
+                dataset["loaded"] = False
+            self._datasets_generation = self.kernel.generation
+        for name in list(self.datasets):
+            if re.search(rf"\b{name}\b", code):
+                if self.datasets[name]["loaded"]:
+                    self.datasets.move_to_end(name)
+                else:
+                    self._load(name)
+
+    def _snapshot_files(self):
+        output_dir = os.path.join(self.work_dir, "files")
+        return {
+            name: os.stat(os.path.join(output_dir, name)).st_mtime_ns
+            for name in os.listdir(output_dir)
+        }
+
+    def run(self, code):
+        try:
+            self._prepare_datasets(code)
+            before_files = self._snapshot_files()
+            with trace_span("kernel.execute"):
+                stdout, stderr = self.kernel.execute(code)
+            output = stdout.strip()
+            if stderr.strip():
+                output += f"\n[stderr]\n{stderr.strip()}"
+
+            # kernel의 ./files/에 새로 생기거나 바뀐 파일
+            file_paths = [
+                os.path.join(self.work_dir, "files", name)
+                for name, mtime in self._snapshot_files().items()
+                if before_files.get(name) != mtime
+            ]
+            return output.strip(), file_paths
+
+        except Exception as e:
+            error_msg = f"[Code Interpreter 오류]\n{traceback.format_exc()}"
+            return error_msg, []
+
+    def close(self):
+        self.kernel.close()
+        shutil.rmtree(self.work_dir, ignore_errors=True)
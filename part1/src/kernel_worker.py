@@ -0,0 +1,154 @@
+"""
+로컬 직접 실행 모드에서 사용하는 Python 실행 worker
+
+LocalKernel(src/executors.py)이 subprocess로 실행합니다.
+표준 입력으로 JSON 한 줄을 받아 처리하고, 결과를 표준 출력으로 JSON 한 줄 반환합니다.
+시작하면 protocol용으로 fd 0 / 1을 복제해 두고, 실행하는 코드의 fd 0은 /dev/null, fd 1은 stderr로 바꿉니다
+(os.system, subprocess, C extension이 fd 1에 직접 쓰더라도 protocol이 깨지지 않음).
+- {"op": "attach", "work_dir": ...}: 세션의 작업 디렉터리로 이동
+- {"op": "exec", "code": ...}: 같은 전역 변수 공간에서 코드를 실행하고 {"stdout": ..., "stderr": ...} 반환
+- {"op": "load", "name": ..., "path": ..., "format": ...}: 파일을 DataFrame 변수로 미리 로드
+- {"op": "evict", "name": ...}: 미리 로드한 DataFrame 변수를 삭제하여 메모리 확보
+Jupyter kernel처럼 호출 사이에 변수가 유지됩니다.
+
+시작할 때 명령행 인자로 받은 값으로 메모리 / 파일 크기 / 열린 파일 수를 rlimit으로 제한합니다.
+자원 사용량 제한일 뿐 보안 격리(seccomp / namespace / 별도 uid)는 아닙니다.
+"""
+import gc
+import io
+import os
+import json
+import sys
+import argparse
+import resource
+import tempfile
+import traceback
+from contextlib import redirect_stderr, redirect_stdout
+
+
+def display(*objects):
+    """Code Interpreter(Jupyter)의 display()와 같은 용도로 사용할 수 있도록 제공"""
+    for obj in objects:
+        print(obj)
+
+
+def _preload(namespace):
+    """자주 쓰는 라이브러리를 미리 import하여 첫 실행을 빠르게 함"""
+    try:
+        import numpy as np
+        import pandas as pd
+        import matplotlib
+
+        matplotlib.use("Agg")
+        import matplotlib.pyplot as plt
+    except ImportError:
+        return
+    namespace.update({"np": np, "pd": pd, "plt": plt})
+
+
+def _exec(code, namespace):
+    stdout, stderr = io.StringIO(), io.StringIO()
+    # print()는 redirect_stdout으로, os.system / subprocess / C extension이 fd 1, 2에 직접 쓴 출력은
+    # 임시 파일로 받아 stdout 뒤에 붙임
+    with tempfile.TemporaryFile() as captured:
+        saved_fds = os.dup(1), os.dup(2)
+        os.dup2(captured.fileno(), 1)
+        os.dup2(captured.fileno(), 2)
+        try:
+            with redirect_stdout(stdout), redirect_stderr(stderr):
+                try:
+                    exec(compile(code, "<code_interpreter>", "exec"), namespace)
+                except BaseException:
+                    # SystemExit 등도 worker를 종료시키지 않고 오류로 반환 (worker 자신의 frame은 제외)
+                    exc_type, exc_value, exc_tb = sys.exc_info()
+                    traceback.print_exception(exc_type, exc_value, exc_tb.tb_next)
+        finally:
+            sys.__stdout__.flush()
+            sys.__stderr__.flush()
+            os.dup2(saved_fds[0], 1)
+            os.dup2(saved_fds[1], 2)
+            for fd in saved_fds:
+                os.close(fd)
+        captured.seek(0)
+        fd_output = captured.read().decode("utf-8", errors="replace")
+    return {"stdout": stdout.getvalue() + fd_output, "stderr": stderr.getvalue()}
+
+
+def _load(request, namespace):
+    try:
+        import pandas as pd
+
+        path, file_format = request["path"], request["format"]
+        if file_format == "parquet":
+            df = pd.read_parquet(path)
+        elif file_format == "arrow":
+            import pyarrow.ipc
+
+            df = pyarrow.ipc.open_file(path).read_pandas()
+        else:
+            df = pd.read_csv(path)
+    except Exception as e:
+        return {"ok": False, "error": f"{type(e).__name__}: {e}"}
+    namespace[request["name"]] = df
+    return {
+        "ok": True,
+        "rows": len(df),
+        "columns": [str(column) for column in df.columns],
+        "memory_bytes": int(df.memory_usage(deep=True).sum()),
+    }
+
+
+def _evict(request, namespace):
+    namespace.pop(request["name"], None)
+    gc.collect()
+    return {"ok": True}
+
+
+def _limit_resources(argv):
+    """라이브러리를 import하기 전에 worker 자신의 rlimit을 설정 (LocalKernel이 인자로 전달)"""
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--memory-limit-bytes", type=int, default=4 * 1024**3)
+    parser.add_argument("--file-size-limit-bytes", type=int, default=1024**3)
+    args = parser.parse_args(argv)
+    resource.setrlimit(resource.RLIMIT_AS, (args.memory_limit_bytes, args.memory_limit_bytes))
+    resource.setrlimit(resource.RLIMIT_FSIZE, (args.file_size_limit_bytes, args.file_size_limit_bytes))
+    resource.setrlimit(resource.RLIMIT_NOFILE, (256, 256))
+    resource.setrlimit(resource.RLIMIT_CORE, (0, 0))
+
+
+def _open_protocol_streams():
+    """
+    protocol용 입출력을 별도 fd로 복제하고, fd 0은 /dev/null, fd 1은 stderr로 바꿈
+    (코드가 input()으로 요청을 읽거나 fd 1에 써서 응답 JSON이 섞이지 않도록)
+    """
+    protocol_in = os.fdopen(os.dup(0), "r", encoding="utf-8")
+    protocol_out = os.fdopen(os.dup(1), "w", encoding="utf-8")
+    devnull = os.open(os.devnull, os.O_RDONLY)
+    os.dup2(devnull, 0)
+    os.close(devnull)
+    os.dup2(2, 1)
+    return protocol_in, protocol_out
+
+
+def main():
+    _limit_resources(sys.argv[1:])
+    protocol_in, protocol_out = _open_protocol_streams()
+    namespace = {"__name__": "__main__", "display": display}
+    _preload(namespace)
+    for line in protocol_in:
+        request = json.loads(line)
+        if request["op"] == "attach":
+            os.chdir(request["work_dir"])
+            response = {"ok": True}
+        elif request["op"] == "load":
+            response = _load(request, namespace)
+        elif request["op"] == "evict":
+            response = _evict(request, namespace)
+        else:
+            response = _exec(request["code"], namespace)
+        protocol_out.write(json.dumps(response) + "\n")
+        protocol_out.flush()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,29 +1,139 @@
-from langchain_core.tools import tool
-from pydantic import BaseModel, Field
 import json
+import time
+import threading
+from collections import OrderedDict
+from langchain_core.runnables import RunnableConfig
+from langchain_core.tools import StructuredTool
+from pydantic import BaseModel, Field
+from src.code_interpreter import CodeInterpreterClient
+
+
+class CodeInterpreterRegistry:
+    """
+    세션(LangGraph thread_id)별 CodeInterpreterClient 저장소
+
+    LangGraph는 별도 스레드에서 tool을 실행하므로 st.session_state에 접근할 수 없습니다.
+    tool은 실행 시 전달되는 config의 thread_id로 자신의 세션 client를 찾으므로,
+    여러 사용자가 동시에 접속해도 서로의 실행 환경이 섞이지 않습니다.
+    - max_sessions를 넘으면 가장 오래 사용하지 않은 세션부터 종료
+    - idle_timeout_seconds 동안 사용하지 않은 세션은 종료
+    - 업로드 / 코드 실행 중인 세션은 종료하지 않음 (모두 실행 중이면 잠시 max_sessions를 넘을 수 있음)
+    - 종료된 세션이 다시 사용되면 새 client를 만들고 reset_reason에 종료 이유를 기록하여
+      UI와 agent가 업로드 파일 / 변수가 사라졌음을 알 수 있게 함
+    """
+
+    def __init__(
+        self,
+        factory=CodeInterpreterClient,
+        max_sessions=16,
+        idle_timeout_seconds=30 * 60,
+        max_reset_records=1024,
+    ):
+        self.factory = factory
+        self.max_sessions = max_sessions
+        self.idle_timeout_seconds = idle_timeout_seconds
+        self.max_reset_records = max_reset_records
+        self._clients = {}  # session_id -> (client, last_used_at)
+        self._session_locks = {}
+        self._reset_reasons = OrderedDict()  # 종료된 session_id -> 종료 이유
+        self._lock = threading.Lock()
+
+    def get_or_create(self, session_id):
+        """세션의 client를 반환 (없으면 생성). 생성은 세션별로만 직렬화됨"""
+        with self._lock:
+            session_lock = self._session_locks.setdefault(session_id, threading.Lock())
+        with session_lock:
+            with self._lock:
+                entry = self._clients.get(session_id)
+                if entry is not None:
+                    self._clients[session_id] = (entry[0], time.monotonic())
+                    return entry[0]
+            client = self.factory(session_id=session_id)
+            with self._lock:
+                client.reset_reason = self._reset_reasons.pop(session_id, None)
+                self._clients[session_id] = (client, time.monotonic())
+                evicted = self._pop_evictable(keep=session_id)
+        for evicted_client in evicted:
+            evicted_client.close()
+        return client
+
+    def get(self, session_id):
+        with self._lock:
+            entry = self._clients.get(session_id)
+            if entry is None:
+                raise KeyError(f"No code interpreter session: {session_id}")
+            self._clients[session_id] = (entry[0], time.monotonic())
+            return entry[0]
+
+    def remove(self, session_id):
+        with self._lock:
+            entry = self._clients.pop(session_id, None)
+            self._session_locks.pop(session_id, None)
+        if entry is not None:
+            entry[0].close()
 
+    def _pop_evictable(self, keep):
+        """lock을 잡은 상태에서 호출. 유휴 / 초과 세션을 목록에서 빼서 반환"""
+        now = time.monotonic()
+        by_last_used = sorted(self._clients.items(), key=lambda item: item[1][1])
+        evicted = []
+        for session_id, (client, last_used_at) in by_last_used:
+            if session_id == keep or client.is_busy():
+                continue
+            idle = now - last_used_at > self.idle_timeout_seconds
+            if idle or len(self._clients) > self.max_sessions:
+                del self._clients[session_id]
+                self._session_locks.pop(session_id, None)
+                self._reset_reasons[session_id] = (
+                    f"{self.idle_timeout_seconds / 60:.0f}분 동안 사용하지 않아"
+                    if idle
+                    else "동시에 사용할 수 있는 세션 수를 넘어"
+                )
+                evicted.append(client)
+        while len(self._reset_reasons) > self.max_reset_records:
+            self._reset_reasons.popitem(last=False)
+        return evicted
 
-# 모듈 레벨 변수 - LangGraph가 별도 스레드에서 tool을 실행하므로
-# st.session_state 대신 이 변수를 통해 client에 접근
-_code_interpreter_client = None
+    def stats(self):
+        with self._lock:
+            return {"sessions": len(self._clients), "max_sessions": self.max_sessions}
+
+
+# 프로세스 공용 registry
+code_interpreter_registry = CodeInterpreterRegistry()
 
-def set_code_interpreter_client(client):
-    """main.py에서 세션 초기화 시 호출하여 client를 설정"""
-    global _code_interpreter_client
-    _code_interpreter_client = client
 
 class ExecPythonInput(BaseModel):
     """타입을 지정하기 위한 클래스"""
 
     code: str = Field()
 
-@tool(args_schema=ExecPythonInput)
-def code_interpreter_tool(code):
-    """
+def _format_result(text_result, file_names):
+    # 결과를 명확한 형식으로 포맷팅
+    return json.dumps([text_result, file_names or []], ensure_ascii=False)
+
+
+def _run_code(code, config: RunnableConfig):
+    # config의 thread_id로 현재 세션의 client를 찾음 (turn은 생성한 파일의 index에 기록)
+    session_id = config["configurable"]["thread_id"]
+    turn = config["configurable"].get("turn")
+    client = code_interpreter_registry.get_or_create(session_id)
+    # 실행 환경이 종료되어 새로 만들어졌으면 이전 파일 / 변수가 없다는 것을 결과 앞에 알림
+    notice = client.take_reset_notice()
+    text_result, file_names = client.run(code, turn)
+    return _format_result(notice + text_result, file_names)
+
+
+# 모델이 한 step에서 여러 tool을 호출하면 LangGraph ToolNode가 thread pool에서 동시에 실행함
+# (같은 세션의 실행은 CodeInterpreterClient의 세션 lock으로 한 번에 하나씩 실행됨)
+code_interpreter_tool = StructuredTool.from_function(
+    func=_run_code,
+    name="code_interpreter_tool",
+    description="""
     Code Interpreter를 사용해 Python 코드를 실행합니다.
 
     - 데이터 가공, 시각화, 수식 계산, 통계 분석, 텍스트 분석에 적합합니다.
-    - 인터넷 연결이 없어 외부 사이트 접근이나 라이브러리 설치는 불가합니다.
+    - 외부 사이트 접근이나 라이브러리 설치는 하지 마세요 (필요한 데이터는 업로드된 파일과 쿼리 결과를 사용).
     - 코드 실행 결과와 생성 파일을 함께 확인할 수 있습니다.
 
     오류 발생 시:
@@ -33,12 +143,7 @@ def code_interpreter_tool(code):
 
     Returns:
     - text: Code Interpreter의 코드 실행 결과
-    - files: Code Interpreter가 생성한 파일 경로 (`./files/` 이하)
-    """
-    text_result, file_names = _code_interpreter_client.run(code)
-
-    # 결과를 명확한 형식으로 포맷팅
-    if file_names:
-        return json.dumps([text_result, file_names], ensure_ascii=False)
-    else:
-        return json.dumps([text_result, []], ensure_ascii=False)
+    - files: Code Interpreter가 생성한 파일 경로 (`./files/<session>/` 이하)
+    """,
+    args_schema=ExecPythonInput,
+)
@@ -1,18 +1,33 @@
+import os
 import re
+import time
+import hashlib
 import streamlit as st
 from langsmith import uuid7
 from langchain.agents import create_agent
-from langgraph.checkpoint.memory import InMemorySaver
-
-# models
-from langchain_openai import ChatOpenAI
-from langchain_anthropic import ChatAnthropic
-from langchain_google_genai import ChatGoogleGenerativeAI
+from langchain_core.messages import AIMessage, AIMessageChunk, ToolMessage
 
 # custom tools
-from src.code_interpreter import CodeInterpreterClient
-from tools.code_interpreter import code_interpreter_tool, set_code_interpreter_client
-from tools.bigquery import BigQueryClient
+from src.artifacts import get_artifact_store
+from src.checkpointer import get_checkpointer
+from src.context_compaction import ContextCompactionMiddleware
+from src.code_interpreter import get_container_pool
+from src.tracing import TracingMiddleware, format_waterfall, get_trace_collector, trace_span
+from tools.code_interpreter import code_interpreter_registry, code_interpreter_tool
+from tools.bigquery import (
+    BigQueryClient,
+    QueryBudget,
+    QueryJobTracker,
+    format_bytes,
+    format_job_progress,
+    query_result_cache,
+    table_catalog_cache,
+)
+
+
+TOOL_RESULT_PREVIEW_LENGTH = 300
+HISTORY_WINDOW_TURNS = 10
+MODELS = ("GPT-5.2", "Claude Sonnet 4.5", "Gemini 2.5 Flash")
 
 
 @st.cache_data  # 캐시를 사용하도록 변경
@@ -21,6 +36,23 @@ def load_system_prompt(file_path):
         return f.read()
 
 
+def get_code_interpreter_client():
+    """현재 세션의 CodeInterpreterClient (유휴 시간 초과로 종료되었으면 새로 생성)"""
+    client = code_interpreter_registry.get_or_create(st.session_state["thread_id"])
+    # 이전 실행 환경이 종료되어 새로 만든 client이면, 사라진 업로드 파일을 system prompt와 목록에서 지우고 한 번 알림
+    if client.reset_reason and st.session_state.get("reset_notified_client") != id(client):
+        st.session_state["reset_notified_client"] = id(client)
+        st.session_state.custom_system_prompt = load_system_prompt(
+            "./prompt/system_prompt.txt"
+        )
+        st.session_state.uploaded_files = []
+        st.warning(
+            f"{client.reset_reason} Code Interpreter 실행 환경을 새로 시작했습니다. "
+            "이전에 업로드한 파일과 변수는 사라졌으니 필요하면 파일을 다시 업로드해 주세요."
+        )
+    return client
+
+
 def init_page():
     st.set_page_config(page_title="Data Analysis Agent", page_icon="🤗")
     st.header("Data Analysis Agent 🤗", divider="rainbow")
@@ -31,47 +63,97 @@ def init_page():
     if clear_button or "messages" not in st.session_state:
         welcome_message = "안녕하세요! BigQuery 데이터 분석 에이전트입니다. 분석하고 싶은 내용을 입력해주세요 🤗"
         st.session_state.messages = [{"role": "assistant", "content": welcome_message}]
+        st.session_state.history_turns = HISTORY_WINDOW_TURNS
         # 대화가 리셋될 때 Code Interpreter의 세션도 다시 생성
-        st.session_state.code_interpreter_client = CodeInterpreterClient()
-        set_code_interpreter_client(st.session_state.code_interpreter_client)
-        st.session_state["checkpointer"] = InMemorySaver()
+        if "thread_id" in st.session_state:
+            code_interpreter_registry.remove(st.session_state["thread_id"])
+            # 이전 대화의 checkpoint와 생성 파일도 삭제
+            st.session_state["checkpointer"].delete_thread(st.session_state["thread_id"])
+            get_artifact_store().delete_session(st.session_state["thread_id"])
+        st.session_state.query_budget = QueryBudget()
+        st.session_state.query_job_tracker = QueryJobTracker()
+        st.session_state["checkpointer"] = get_checkpointer()
+        st.session_state.context_compaction = ContextCompactionMiddleware()
+        # checkpointer와 middleware가 바뀌었으므로 agent도 다시 생성
+        st.session_state.pop("agent_cache_key", None)
         st.session_state["thread_id"] = str(uuid7())
+        code_interpreter_registry.get_or_create(st.session_state["thread_id"])
         st.session_state.custom_system_prompt = load_system_prompt(
             "./prompt/system_prompt.txt"
         )
         st.session_state.uploaded_files = []
 
 
-def select_model():
-    models = ("GPT-5.2", "Claude Sonnet 4.5", "Gemini 2.5 Flash")
-    model = st.sidebar.radio("Choose a model:", models)
+@st.cache_resource
+def get_chat_model(model):
+    """
+    모델 client는 모델별로 프로세스에서 한 번만 생성하여 모든 세션이 공유합니다
+    (provider SDK의 HTTP client와 keep-alive connection pool을 재사용)
+    provider SDK는 import가 느리므로 선택한 모델의 SDK만 처음 사용할 때 import합니다
+    """
     if model == "GPT-5.2":
+        from langchain_openai import ChatOpenAI
+
         return ChatOpenAI(temperature=0, model="gpt-5.2")
     elif model == "Claude Sonnet 4.5":
+        from langchain_anthropic import ChatAnthropic
+
         return ChatAnthropic(temperature=0, model="claude-sonnet-4-5-20250929")
     elif model == "Gemini 2.5 Flash":
+        from langchain_google_genai import ChatGoogleGenerativeAI
+
         return ChatGoogleGenerativeAI(temperature=0, model="gemini-2.5-flash")
 
 
-def create_data_analysis_agent(bq_client):
+def select_model():
+    return st.sidebar.radio("Choose a model:", MODELS)
+
+
+def create_data_analysis_agent(bq_client, model):
     tools = [
         bq_client.get_table_info_tool(),
+        bq_client.aggregate_query_tool(),
         bq_client.exec_query_tool(),
         code_interpreter_tool,
     ]
-    llm = select_model()
+    llm = get_chat_model(model)
 
     agent = create_agent(
         model=llm,
         tools=tools,
         system_prompt=st.session_state.custom_system_prompt,
         checkpointer=st.session_state["checkpointer"],
+        # 이전 tool 결과를 줄이고 model 호출당 token 예산을 지키도록 prompt를 압축
+        # model / tool 호출 시간은 TracingMiddleware가 span으로 기록
+        middleware=[st.session_state.context_compaction, TracingMiddleware()],
         debug=True,
     )
 
     return agent
 
 
+def get_data_analysis_agent(model):
+    """
+    compile한 agent를 세션에 저장해두고, 모델이나 시스템 프롬프트가 바뀔 때만 다시 생성합니다
+    질문을 입력했을 때 처음 생성하므로, 페이지를 처음 열 때는 모델 / BigQuery client를 만들지 않습니다
+    """
+    prompt_version = hashlib.sha256(
+        st.session_state.custom_system_prompt.encode("utf-8")
+    ).hexdigest()
+    # BigQuery tool이 CodeInterpreterClient를 참조하므로, 유휴 시간 초과로 client가 새로 생성되면 다시 생성
+    code_interpreter = get_code_interpreter_client()
+    cache_key = (model, prompt_version, id(code_interpreter))
+    if st.session_state.get("agent_cache_key") != cache_key:
+        bq_client = BigQueryClient(
+            code_interpreter,
+            budget=st.session_state.query_budget,
+            job_tracker=st.session_state.query_job_tracker,
+        )
+        st.session_state.data_analysis_agent = create_data_analysis_agent(bq_client, model)
+        st.session_state.agent_cache_key = cache_key
+    return st.session_state.data_analysis_agent
+
+
 def parse_response(response):
     """
     response에서 text와 image_paths를 가져옵니다
@@ -116,38 +198,235 @@ def normalize_image_path(path):
         return "./" + path
     return None
 
-def display_content(content):
+def parse_content(content):
+    """메시지를 화면에 표시할 (text, image_paths)로 변환"""
     text, image_paths = parse_response(content)
     image_paths = [p for p in (normalize_image_path(path) for path in image_paths) if p is not None]
+    return text, image_paths
+
+
+def display_content(content, key, render=None, thumbnails=None):
+    text, image_paths = render or parse_content(content)
     st.write(text)
-    for image_path in image_paths:
+    for i, image_path in enumerate(image_paths):
+        show_image(image_path, key=f"{key}-{i}", thumbnails=thumbnails)
+
+
+def show_image(image_path, key, thumbnails=None):
+    """
+    thumbnails는 메시지에 저장해 두는 (이미지 경로 -> 미리보기 경로) 캐시로,
+    rerun할 때마다 미리보기를 다시 확인(작은 이미지는 Pillow로 다시 열기)하지 않음
+    """
+    if not os.path.exists(image_path):
+        st.caption(f"(저장 공간 정리로 삭제된 이미지입니다: {os.path.basename(image_path)})")
+        return
+    # 대화 기록에는 크기를 줄인 미리보기를 표시하고, 원본은 요청했을 때만 전송
+    if thumbnails is None:
+        thumbnails = {}
+    if image_path not in thumbnails:
+        thumbnails[image_path] = get_artifact_store().thumbnail(image_path)
+    thumbnail = thumbnails[image_path]
+    st.image(thumbnail, caption="")
+    if thumbnail != image_path and st.toggle("원본 크기로 보기", key=f"full-{key}"):
         st.image(image_path, caption="")
 
 
+def show_chat_history():
+    """
+    최근 history_turns개의 turn만 표시하고, 이전 대화는 "이전 대화 더 보기"로 불러옴
+    파싱 결과는 메시지에 저장해 두므로 rerun할 때마다 다시 파싱하지 않음
+    """
+    messages = st.session_state.messages
+    user_indices = [i for i, msg in enumerate(messages) if msg["role"] == "user"]
+    window = st.session_state.history_turns
+    start = user_indices[-window] if len(user_indices) > window else 0
+    if start > 0 and st.button(f"이전 대화 더 보기 ({len(user_indices) - window} turns)", key="load_more"):
+        st.session_state.history_turns += HISTORY_WINDOW_TURNS
+        st.rerun()
+    displayed_images = []
+    for index in range(start, len(messages)):
+        msg = messages[index]
+        if "render" not in msg:
+            msg["render"] = parse_content(msg["content"])
+        displayed_images += msg["render"][1]
+        with st.chat_message(msg["role"]):
+            display_content(
+                msg["content"],
+                key=f"msg-{index}",
+                render=msg["render"],
+                thumbnails=msg.setdefault("thumbnails", {}),
+            )
+    # 표시한 이미지의 사용 시각을 rerun마다 한 번에 갱신하여, 보고 있는 대화의 이미지는 저장소 정리(LRU) 대상에서 뒤로 밀림
+    if displayed_images:
+        get_artifact_store().touch_many(displayed_images)
+
+
+def current_turn():
+    """지금까지 사용자가 입력한 질문 수 (생성한 파일을 turn별로 기록하기 위해 사용)"""
+    return sum(1 for msg in st.session_state.messages if msg["role"] == "user")
+
+
+def show_tool_call(tool_call):
+    with st.expander(f"🛠️ {tool_call['name']}", expanded=False):
+        args = tool_call["args"]
+        if "code" in args:
+            st.code(args["code"], language="python")
+        elif "query" in args:
+            st.code(args["query"], language="sql")
+        else:
+            st.json(args)
+
+
+def show_tool_result(message):
+    content = message.text
+    if len(content) > TOOL_RESULT_PREVIEW_LENGTH:
+        content = content[:TOOL_RESULT_PREVIEW_LENGTH] + " ..."
+    st.caption(f"↳ {message.name}: {content}")
+
+
+def stream_agent_response(agent, prompt, config):
+    """
+    agent 실행 과정을 스트리밍으로 표시하고 최종 답변을 반환합니다
+    - messages: model이 생성하는 token을 바로 표시
+    - updates: 한 step이 끝날 때마다 tool 호출과 tool 결과를 표시
+    - custom: BigQuery job의 진행 상황을 표시
+    """
+    text_placeholder = st.empty()
+    streamed_text = ""
+    answer = ""
+    started_at = time.perf_counter()
+    first_token_at = None
+    progress_placeholder = st.empty()
+
+    try:
+        for mode, chunk in agent.stream(
+            {"messages": [("user", prompt)]},
+            config,
+            stream_mode=["messages", "updates", "custom"],
+        ):
+            if mode == "messages":
+                message, metadata = chunk
+                if metadata.get("langgraph_node") != "model" or not isinstance(message, AIMessageChunk):
+                    continue
+                token = message.text
+                if not token:
+                    continue
+                if first_token_at is None:
+                    first_token_at = time.perf_counter()
+                    print(f"[stream] time to first token: {first_token_at - started_at:.2f}s")
+                streamed_text += token
+                text_placeholder.markdown(streamed_text + "▌")
+            elif mode == "updates":
+                for update in chunk.values():
+                    for message in (update or {}).get("messages", []):
+                        if isinstance(message, AIMessage) and message.tool_calls:
+                            # tool 호출 전의 텍스트는 중간 설명으로 남겨두고, 이후 token은 새 영역에 표시
+                            text_placeholder.markdown(streamed_text)
+                            for tool_call in message.tool_calls:
+                                show_tool_call(tool_call)
+                            text_placeholder = st.empty()
+                            streamed_text = ""
+                        elif isinstance(message, AIMessage):
+                            answer = message.text
+                        elif isinstance(message, ToolMessage):
+                            show_tool_result(message)
+            elif mode == "custom" and chunk.get("type") == "bigquery_progress":
+                progress_placeholder.caption(format_job_progress(chunk))
+    except BaseException:
+        # 실행 중 "Stop running queries" 버튼 등으로 rerun되면 Streamlit이 여기서 예외를 발생시킴
+        cancel_interrupted_queries()
+        raise
+    progress_placeholder.empty()
+    print(f"[stream] total response time: {time.perf_counter() - started_at:.2f}s")
+    # 이미지 태그를 처리하기 위해 최종 답변은 display_content로 다시 표시
+    text_placeholder.empty()
+    return answer
+
+
+def cancel_interrupted_queries():
+    """
+    agent stream이 중단될 때(rerun 등) stream을 닫기 전에 실행 중인 BigQuery job을 취소합니다
+    stream generator를 닫으면 LangGraph가 실행 중인 tool thread(wait_for_query)가 끝나기를 기다리므로,
+    먼저 취소해야 job이 끝나거나 timeout될 때까지 막히지 않습니다
+    """
+    cancelled = st.session_state.query_job_tracker.cancel_all()
+    if cancelled:
+        print(f"[stream] cancelled {cancelled} running BigQuery jobs")
+        st.session_state.cancelled_query_count = cancelled
+
+
+def stop_running_queries():
+    # 실행 중 버튼을 누르면 Streamlit이 rerun되면서, 중단되는 agent stream이 먼저 job을 취소하고
+    # 취소한 수를 cancelled_query_count에 남김 (agent를 실행하지 않을 때 누르면 여기서 취소)
+    cancelled = st.session_state.pop("cancelled_query_count", 0)
+    if st.sidebar.button("Stop running queries", key="stop"):
+        cancelled += st.session_state.query_job_tracker.cancel_all()
+        st.sidebar.info(f"{cancelled}개의 BigQuery job을 취소했습니다.")
+    for progress in st.session_state.query_job_tracker.active_progress():
+        st.sidebar.caption(format_job_progress(progress))
+
+
 def main():
     init_page()
-    bq_client = BigQueryClient(st.session_state.code_interpreter_client)
-    data_analysis_agent = create_data_analysis_agent(bq_client)
+    stop_running_queries()
+    model = select_model()
+    catalog_stats = table_catalog_cache.stats()
+    query_stats = query_result_cache.stats()
+    st.sidebar.caption(
+        f"Catalog cache: {catalog_stats['hits']} hits / {catalog_stats['misses']} misses  \n"
+        f"Query cache: {query_stats['hits']} hits / {query_stats['misses']} misses  \n"
+        f"Scanned this session: {format_bytes(st.session_state.query_budget.bytes_processed)}"
+    )
+    context_stats = st.session_state.context_compaction.stats()
+    if context_stats["calls"]:
+        st.sidebar.caption(
+            f"Prompt: ~{context_stats['last_input_tokens']:,} tokens "
+            f"(before compaction ~{context_stats['last_original_tokens']:,}), "
+            f"max ~{context_stats['max_input_tokens']:,}"
+        )
+    # memory backend는 세션별 InMemorySaver이므로 통계를 제공하지 않음
+    if hasattr(st.session_state["checkpointer"], "stats"):
+        checkpoint_stats = st.session_state["checkpointer"].stats()
+        st.sidebar.caption(
+            f"Checkpoints: {checkpoint_stats['checkpoints']} in {checkpoint_stats['threads']} threads, "
+            f"db {format_bytes(checkpoint_stats['db_bytes'])}, "
+            f"process {format_bytes(checkpoint_stats['process_rss_bytes'])}"
+        )
+    # direct 모드이거나 아직 코드를 실행하지 않아 Container를 할당받지 않았으면 표시하지 않음
+    if get_code_interpreter_client().container_pool is not None:
+        pool_stats = get_container_pool().stats()
+        st.sidebar.caption(
+            f"Container pool: {pool_stats['warm']} warm, {pool_stats['hits']} hits / "
+            f"{pool_stats['cold_starts']} cold starts, avg wait {pool_stats['avg_wait_seconds']:.1f}s"
+        )
     config = {"configurable": {"thread_id": st.session_state["thread_id"]}}
 
-    for msg in st.session_state.messages:
-        with st.chat_message(msg["role"]):
-            display_content(msg["content"])
+    show_chat_history()
 
     if prompt := st.chat_input(placeholder="분석하고 싶은 내용을 입력해주세요."):
         st.chat_message("user").write(prompt)
         st.session_state.messages.append({"role": "user", "content": prompt})
 
         with st.chat_message("assistant"):
-            with st.spinner("분석 중..."):
-                result = data_analysis_agent.invoke(
-                    {"messages": [("user", prompt)]}, config
-                )
-            answer = result["messages"][-1].content
-            display_content(answer)
+            config["configurable"]["turn"] = current_turn()
+            with trace_span(
+                "agent.turn",
+                model=model,
+                thread_id=st.session_state["thread_id"],
+                turn=config["configurable"]["turn"],
+            ) as span:
+                st.session_state.last_trace_id = span.get_span_context().trace_id
+                answer = stream_agent_response(get_data_analysis_agent(model), prompt, config)
+                display_content(answer, key=f"msg-{len(st.session_state.messages)}")
 
         st.session_state.messages.append({"role": "assistant", "content": answer})
 
+    # 마지막 turn에서 어디에 시간이 걸렸는지 (model 호출 / tool 실행 / BigQuery job 등)
+    spans = get_trace_collector().get_trace(st.session_state.get("last_trace_id"))
+    if spans:
+        with st.sidebar.expander("Last turn latency"):
+            st.code(format_waterfall(spans), language=None)
+
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,174 @@
+"""
+Code Interpreter가 생성한 파일(차트 이미지 등)을 보관하는 로컬 artifact 저장소
+
+이전에는 모든 세션이 ./files/ 한 곳에 sandbox의 파일명 그대로 저장했기 때문에
+동시에 접속한 세션끼리 plot.png를 덮어쓰고, 서버를 오래 띄워두면 디렉터리가 계속 커졌습니다.
+- 세션별 디렉터리(./files/<session_id>/)에 내용 해시를 파일명으로 저장 (덮어쓰기 없음)
+- 세션 / turn별 artifact 목록을 SQLite index에 기록
+- 이미지는 저장할 때 크기를 줄인 WebP 미리보기를 함께 만들어 둠
+- 전체 크기가 max_bytes를 넘으면 가장 오래 표시되지 않은 파일부터 삭제 (LRU)
+  대화 기록의 이미지는 표시할 때마다 touch()로 사용 시각이 갱신되므로,
+  보고 있는 대화의 이미지는 삭제되지 않습니다.
+"""
+import os
+import time
+import shutil
+import hashlib
+import sqlite3
+import threading
+
+
+def thumbnail_path(path):
+    return f"{os.path.splitext(path)[0]}.thumb.webp"
+
+
+class ArtifactStore:
+    def __init__(self, root="./files/", max_bytes=1024**3, thumbnail_max_px=800):
+        self.root = root
+        self.max_bytes = max_bytes
+        # 대화 기록에는 이 크기 이하로 줄인 WebP 미리보기를 표시 (원본은 요청했을 때만 표시)
+        self.thumbnail_max_px = thumbnail_max_px
+        os.makedirs(root, exist_ok=True)
+        self._conn = sqlite3.connect(os.path.join(root, "index.sqlite"), check_same_thread=False)
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS artifacts (
+                path TEXT PRIMARY KEY,
+                session_id TEXT NOT NULL,
+                turn INTEGER,
+                name TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                last_accessed_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS artifacts_by_session ON artifacts (session_id, turn);
+            CREATE INDEX IF NOT EXISTS artifacts_by_access ON artifacts (last_accessed_at);
+            """
+        )
+        self._lock = threading.Lock()
+        self.evicted = 0
+
+    def put(self, session_id, source_path, turn=None):
+        """
+        파일을 세션 디렉터리에 복사하고 저장 경로(./files/<session_id>/<해시><확장자>)를 반환
+        같은 세션에 같은 내용의 파일이 이미 있으면 복사하지 않음
+        """
+        digest = hashlib.sha256()
+        with open(source_path, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(chunk)
+        extension = os.path.splitext(source_path)[1].lower()
+        session_dir = os.path.join(self.root, session_id)
+        path = os.path.join(session_dir, f"{digest.hexdigest()[:16]}{extension}")
+        now = time.time()
+        with self._lock:
+            if not os.path.exists(path):
+                os.makedirs(session_dir, exist_ok=True)
+                shutil.copyfile(source_path, path)
+                self._make_thumbnail(path)
+            size = os.path.getsize(path)
+            if os.path.exists(thumbnail_path(path)):
+                size += os.path.getsize(thumbnail_path(path))
+            self._conn.execute(
+                """
+                INSERT INTO artifacts (path, session_id, turn, name, size, created_at, last_accessed_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (path) DO UPDATE SET last_accessed_at = excluded.last_accessed_at
+                """,
+                (path, session_id, turn, os.path.basename(source_path), size, now, now),
+            )
+            self._evict_over_quota(keep=path)
+            self._conn.commit()
+        return path
+
+    def _make_thumbnail(self, path):
+        """미리보기를 만들고 경로를 반환. 이미지가 아니거나 이미 작으면 원본 경로를 반환"""
+        try:
+            from PIL import Image
+
+            with Image.open(path) as image:
+                if max(image.size) <= self.thumbnail_max_px:
+                    return path
+                image.thumbnail((self.thumbnail_max_px, self.thumbnail_max_px))
+                image.save(thumbnail_path(path), "WEBP", quality=80)
+        except Exception:
+            # Pillow가 열 수 없는 형식(svg, csv 등)은 원본을 그대로 사용
+            return path
+        return thumbnail_path(path)
+
+    def thumbnail(self, path):
+        """대화 기록에 표시할 미리보기 경로 (저장소 밖의 이전 파일은 처음 요청할 때 만듦)"""
+        if os.path.exists(thumbnail_path(path)):
+            return thumbnail_path(path)
+        return self._make_thumbnail(path)
+
+    def touch_many(self, paths):
+        """표시한 artifact들의 사용 시각을 한 번의 commit으로 갱신 (rerun마다 화면 전체에 대해 한 번 호출)"""
+        paths = list(paths)
+        if not paths:
+            return
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "UPDATE artifacts SET last_accessed_at = ? WHERE path = ?", [(now, path) for path in paths]
+            )
+            self._conn.commit()
+
+    def list_session(self, session_id):
+        """세션의 artifact 목록 (turn 순서)"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT path, turn, name, size FROM artifacts WHERE session_id = ? ORDER BY turn, created_at",
+                (session_id,),
+            ).fetchall()
+        return [dict(zip(("path", "turn", "name", "size"), row)) for row in rows]
+
+    def delete_session(self, session_id):
+        """대화를 초기화할 때 세션의 artifact를 모두 삭제"""
+        with self._lock:
+            self._conn.execute("DELETE FROM artifacts WHERE session_id = ?", (session_id,))
+            self._conn.commit()
+        shutil.rmtree(os.path.join(self.root, session_id), ignore_errors=True)
+
+    def _evict_over_quota(self, keep):
+        """lock을 잡은 상태에서 호출. 전체 크기가 max_bytes 이하가 될 때까지 오래 사용하지 않은 파일부터 삭제"""
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM artifacts").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        rows = self._conn.execute(
+            "SELECT path, size FROM artifacts WHERE path != ? ORDER BY last_accessed_at", (keep,)
+        ).fetchall()
+        for path, size in rows:
+            if total <= self.max_bytes:
+                break
+            for file_path in (path, thumbnail_path(path)):
+                try:
+                    os.remove(file_path)
+                except FileNotFoundError:
+                    pass
+            self._conn.execute("DELETE FROM artifacts WHERE path = ?", (path,))
+            total -= size
+            self.evicted += 1
+
+    def stats(self):
+        with self._lock:
+            count, total = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM artifacts"
+            ).fetchone()
+        return {"artifacts": count, "bytes": total, "max_bytes": self.max_bytes, "evicted": self.evicted}
+
+
+# 프로세스 공용 저장소 (처음 사용할 때 생성)
+_artifact_store = None
+_artifact_store_lock = threading.Lock()
+
+
+def get_artifact_store():
+    global _artifact_store
+    with _artifact_store_lock:
+        if _artifact_store is None:
+            _artifact_store = ArtifactStore(
+                root=os.getenv("ARTIFACT_STORE_DIR", "./files/"),
+                max_bytes=int(os.getenv("ARTIFACT_STORE_MAX_BYTES", str(1024**3))),
+            )
+        return _artifact_store
@@ -0,0 +1,221 @@
+"""
+LangGraph checkpointer
+
+InMemorySaver는 모든 turn의 checkpoint(df.head() 출력이나 코드 실행 로그 같은 tool 결과 포함)를
+계속 보관하므로 긴 세션에서 메모리가 계속 늘어나고, 프로세스를 재시작하면 모든 상태가 사라집니다.
+이 모듈은 로컬 SQLite 파일에 저장하는 checkpointer를 제공합니다.
+- thread별로 최근 K개의 checkpoint만 남기고 나머지는 삭제
+- 오랫동안 사용하지 않은(버려진) thread의 checkpoint는 주기적으로 삭제
+- 크기가 큰 직렬화 결과(긴 tool 메시지 등)는 zlib으로 압축하여 저장
+- 저장량과 프로세스 메모리 사용량을 stats()로 확인
+
+CHECKPOINTER_BACKEND 환경변수로 backend를 선택합니다.
+- sqlite(기본값): 모든 세션이 공유하는 BoundedSqliteSaver
+- memory: 세션별 InMemorySaver (기존 동작)
+"""
+import os
+import time
+import zlib
+import sqlite3
+import threading
+
+from langgraph.checkpoint.memory import InMemorySaver
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+from langgraph.checkpoint.sqlite import SqliteSaver
+
+
+class CompressingSerializer(JsonPlusSerializer):
+    """min_size_bytes 이상인 직렬화 결과를 zlib으로 압축하는 serializer"""
+
+    COMPRESSED_SUFFIX = "+zlib"
+
+    def __init__(self, min_size_bytes=4 * 1024, level=6):
+        super().__init__()
+        self.min_size_bytes = min_size_bytes
+        self.level = level
+        self._lock = threading.Lock()
+        self.raw_bytes = 0
+        self.stored_bytes = 0
+
+    def dumps_typed(self, obj):
+        type_, data = super().dumps_typed(obj)
+        stored = data
+        if len(data) >= self.min_size_bytes:
+            stored = zlib.compress(data, self.level)
+            type_ = type_ + self.COMPRESSED_SUFFIX
+        with self._lock:
+            self.raw_bytes += len(data)
+            self.stored_bytes += len(stored)
+        return type_, stored
+
+    def loads_typed(self, data):
+        type_, payload = data
+        if type_.endswith(self.COMPRESSED_SUFFIX):
+            type_ = type_[: -len(self.COMPRESSED_SUFFIX)]
+            payload = zlib.decompress(payload)
+        return super().loads_typed((type_, payload))
+
+
+class BoundedSqliteSaver(SqliteSaver):
+    """
+    thread별로 최근 keep_last개의 checkpoint만 보관하는 SqliteSaver
+
+    대화 내용은 가장 최근 checkpoint의 messages에 모두 들어 있으므로,
+    이전 checkpoint를 삭제해도 대화를 이어가는 데 문제가 없습니다.
+    (단, 그만큼 이전 시점으로 되돌리는 time travel은 사용할 수 없습니다)
+
+    "Clear Conversation"을 누르지 않고 떠난 세션의 checkpoint가 계속 쌓이지 않도록,
+    thread별 마지막 저장 시각을 기록해 두고 max_idle_seconds 동안 저장이 없던 thread는
+    sweep_interval_seconds마다(그리고 시작할 때) 삭제합니다.
+    """
+
+    def __init__(
+        self,
+        db_path,
+        keep_last=10,
+        serde=None,
+        max_idle_seconds=24 * 3600,
+        sweep_interval_seconds=600,
+    ):
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        conn = sqlite3.connect(db_path, check_same_thread=False)
+        super().__init__(conn, serde=serde or CompressingSerializer())
+        self.db_path = db_path
+        self.keep_last = max(keep_last, 2)
+        self.max_idle_seconds = max_idle_seconds
+        self.sweep_interval_seconds = sweep_interval_seconds
+        self.pruned = 0
+        self.swept_threads = 0
+        with self.cursor() as cur:
+            cur.execute(
+                "CREATE TABLE IF NOT EXISTS thread_activity "
+                "(thread_id TEXT PRIMARY KEY, updated_at REAL NOT NULL)"
+            )
+        self._last_sweep_at = 0.0
+        self.sweep_idle_threads()
+
+    def put(self, config, checkpoint, metadata, new_versions):
+        saved_config = super().put(config, checkpoint, metadata, new_versions)
+        thread_id = str(config["configurable"]["thread_id"])
+        self._prune(thread_id, config["configurable"].get("checkpoint_ns", ""))
+        with self.cursor() as cur:
+            cur.execute(
+                "INSERT INTO thread_activity (thread_id, updated_at) VALUES (?, ?) "
+                "ON CONFLICT (thread_id) DO UPDATE SET updated_at = excluded.updated_at",
+                (thread_id, time.time()),
+            )
+        if time.monotonic() - self._last_sweep_at > self.sweep_interval_seconds:
+            self.sweep_idle_threads()
+        return saved_config
+
+    def delete_thread(self, thread_id):
+        super().delete_thread(thread_id)
+        with self.cursor() as cur:
+            cur.execute("DELETE FROM thread_activity WHERE thread_id = ?", (str(thread_id),))
+
+    def sweep_idle_threads(self):
+        """max_idle_seconds 동안 저장이 없던 thread의 checkpoint를 삭제하고 삭제한 thread 수를 반환"""
+        self._last_sweep_at = time.monotonic()
+        now = time.time()
+        with self.cursor() as cur:
+            # 기록이 없는 thread(이 기능 이전에 저장된 thread)는 지금부터 유휴 시간을 셈
+            cur.execute(
+                "INSERT OR IGNORE INTO thread_activity (thread_id, updated_at) "
+                "SELECT DISTINCT thread_id, ? FROM checkpoints",
+                (now,),
+            )
+            idle_threads = [
+                row[0]
+                for row in cur.execute(
+                    "SELECT thread_id FROM thread_activity WHERE updated_at < ?",
+                    (now - self.max_idle_seconds,),
+                ).fetchall()
+            ]
+        for thread_id in idle_threads:
+            self.delete_thread(thread_id)
+        if idle_threads:
+            print(f"[checkpointer] deleted {len(idle_threads)} idle threads")
+        self.swept_threads += len(idle_threads)
+        return len(idle_threads)
+
+    def _prune(self, thread_id, checkpoint_ns):
+        # checkpoint_id는 시간순으로 정렬되는 uuid6이므로 id 순서로 최근 checkpoint를 고름
+        keep_ids = """
+            SELECT checkpoint_id FROM checkpoints
+            WHERE thread_id = ? AND checkpoint_ns = ?
+            ORDER BY checkpoint_id DESC LIMIT ?
+        """
+        params = (thread_id, checkpoint_ns, thread_id, checkpoint_ns, self.keep_last)
+        with self.cursor() as cur:
+            cur.execute(
+                "DELETE FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? "
+                f"AND checkpoint_id NOT IN ({keep_ids})",
+                params,
+            )
+            pruned = cur.rowcount
+            cur.execute(
+                "DELETE FROM writes WHERE thread_id = ? AND checkpoint_ns = ? "
+                f"AND checkpoint_id NOT IN ({keep_ids})",
+                params,
+            )
+        self.pruned += max(pruned, 0)
+
+    def stats(self):
+        with self.cursor(transaction=False) as cur:
+            threads, checkpoints = cur.execute(
+                "SELECT COUNT(DISTINCT thread_id), COUNT(*) FROM checkpoints"
+            ).fetchone()
+            page_count = cur.execute("PRAGMA page_count").fetchone()[0]
+            page_size = cur.execute("PRAGMA page_size").fetchone()[0]
+        stats = {
+            "backend": "sqlite",
+            "threads": threads,
+            "checkpoints": checkpoints,
+            "pruned": self.pruned,
+            "swept_threads": self.swept_threads,
+            "db_bytes": page_count * page_size,
+            "process_rss_bytes": process_rss_bytes(),
+        }
+        if isinstance(self.serde, CompressingSerializer):
+            stats["serialized_bytes"] = self.serde.raw_bytes
+            stats["stored_bytes"] = self.serde.stored_bytes
+        return stats
+
+
+def process_rss_bytes():
+    """현재 프로세스의 메모리 사용량(RSS). /proc를 읽을 수 없으면 최대 사용량을 반환"""
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        import resource
+
+        # Linux에서는 KB, macOS에서는 byte 단위
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak * 1024 if os.uname().sysname == "Linux" else peak
+
+
+_shared_checkpointer = None
+_shared_checkpointer_lock = threading.Lock()
+
+
+def get_checkpointer_backend():
+    return os.environ.get("CHECKPOINTER_BACKEND", "sqlite")
+
+
+def get_checkpointer():
+    """
+    checkpointer를 반환합니다
+    sqlite backend는 프로세스에서 하나의 DB 연결을 공유하고 thread_id로 세션을 구분합니다
+    """
+    global _shared_checkpointer
+    if get_checkpointer_backend() == "memory":
+        return InMemorySaver(serde=CompressingSerializer())
+    with _shared_checkpointer_lock:
+        if _shared_checkpointer is None:
+            _shared_checkpointer = BoundedSqliteSaver(
+                os.environ.get("CHECKPOINTER_DB_PATH", "./checkpoints/checkpoints.sqlite"),
+                keep_last=int(os.environ.get("CHECKPOINTER_KEEP_LAST", "10")),
+                max_idle_seconds=float(os.environ.get("CHECKPOINTER_MAX_IDLE_SECONDS", str(24 * 3600))),
+            )
+        return _shared_checkpointer
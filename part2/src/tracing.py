@@ -0,0 +1,176 @@
+"""
+OpenTelemetry 기반 tracing
+
+한 turn이 오래 걸렸을 때 어디에서 시간이 걸렸는지(model 추론, tool 실행, BigQuery job 대기,
+결과 다운로드 / 인코딩, Code Interpreter 업로드 / 실행 / 파일 다운로드 등) 확인하기 위해 span을 기록합니다.
+- agent turn, model 호출, tool 호출: 각 entry point와 TracingMiddleware
+- BigQuery job, Container API 호출, 로컬 kernel 실행: 각 client에서 trace_span()으로 기록
+
+TRACE_EXPORTER 환경 변수로 내보낼 곳을 선택합니다.
+- none (기본값): 내보내지 않고 sidebar의 waterfall에만 사용
+- console: 표준 출력 (OpenTelemetry ConsoleSpanExporter)
+- file: TRACE_FILE (기본값 ./traces/spans.jsonl)에 span을 JSON 한 줄씩 기록
+"""
+import os
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from langchain.agents.middleware import AgentMiddleware
+from opentelemetry.sdk.resources import Resource
+from opentelemetry.sdk.trace import SpanProcessor, TracerProvider
+from opentelemetry.sdk.trace.export import (
+    BatchSpanProcessor,
+    ConsoleSpanExporter,
+    SimpleSpanProcessor,
+    SpanExporter,
+    SpanExportResult,
+)
+
+
+class JsonLinesSpanExporter(SpanExporter):
+    """span을 OpenTelemetry JSON 형식으로 파일에 한 줄씩 기록"""
+
+    def __init__(self, path):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._file = open(path, "a", encoding="utf-8")
+        self._lock = threading.Lock()
+
+    def export(self, spans):
+        with self._lock:
+            for span in spans:
+                self._file.write(span.to_json(indent=None) + "\n")
+            self._file.flush()
+        return SpanExportResult.SUCCESS
+
+    def shutdown(self):
+        self._file.close()
+
+
+class RecentTraceCollector(SpanProcessor):
+    """완료된 span을 trace별로 최근 max_traces개까지 메모리에 보관 (sidebar waterfall용)"""
+
+    def __init__(self, max_traces=32):
+        self.max_traces = max_traces
+        self._traces = OrderedDict()  # trace_id -> [span dict]
+        self._lock = threading.Lock()
+
+    def on_end(self, span):
+        context = span.get_span_context()
+        record = {
+            "name": span.name,
+            "span_id": context.span_id,
+            "parent_id": span.parent.span_id if span.parent else None,
+            "start": span.start_time,
+            "end": span.end_time,
+            "attributes": dict(span.attributes or {}),
+        }
+        with self._lock:
+            self._traces.setdefault(context.trace_id, []).append(record)
+            self._traces.move_to_end(context.trace_id)
+            while len(self._traces) > self.max_traces:
+                self._traces.popitem(last=False)
+
+    def get_trace(self, trace_id):
+        with self._lock:
+            return list(self._traces.get(trace_id, []))
+
+
+_tracer = None
+_collector = None
+_tracer_lock = threading.Lock()
+
+
+def _create_tracer():
+    global _collector
+    provider = TracerProvider(resource=Resource.create({"service.name": "data-analysis-agent"}))
+    exporter = os.getenv("TRACE_EXPORTER", "none")
+    if exporter == "console":
+        provider.add_span_processor(SimpleSpanProcessor(ConsoleSpanExporter()))
+    elif exporter == "file":
+        path = os.getenv("TRACE_FILE", "./traces/spans.jsonl")
+        provider.add_span_processor(BatchSpanProcessor(JsonLinesSpanExporter(path)))
+    _collector = RecentTraceCollector()
+    provider.add_span_processor(_collector)
+    # 전역 provider로 등록하지 않고 이 앱의 tracer만 사용 (다른 라이브러리의 OpenTelemetry 설정과 충돌하지 않도록)
+    return provider.get_tracer("data-analysis-agent")
+
+
+def get_tracer():
+    global _tracer
+    with _tracer_lock:
+        if _tracer is None:
+            _tracer = _create_tracer()
+        return _tracer
+
+
+def get_trace_collector():
+    get_tracer()
+    return _collector
+
+
+@contextmanager
+def trace_span(span_name, **attributes):
+    """
+    현재 span의 자식 span을 기록합니다 (None인 attribute는 제외)
+    LangGraph / asyncio.to_thread는 contextvars를 복사하므로 tool을 실행하는 thread에서도 부모 span이 이어집니다
+    """
+    attributes = {key: value for key, value in attributes.items() if value is not None}
+    with get_tracer().start_as_current_span(span_name, attributes=attributes) as span:
+        yield span
+
+
+class TracingMiddleware(AgentMiddleware):
+    """model 호출과 tool 호출을 span으로 기록"""
+
+    def wrap_model_call(self, request, handler):
+        with trace_span("model.call", model=_model_name(request.model), messages=len(request.messages)):
+            return handler(request)
+
+    async def awrap_model_call(self, request, handler):
+        with trace_span("model.call", model=_model_name(request.model), messages=len(request.messages)):
+            return await handler(request)
+
+    def wrap_tool_call(self, request, handler):
+        with trace_span(f"tool.{request.tool_call['name']}", tool_call_id=request.tool_call.get("id")):
+            return handler(request)
+
+    async def awrap_tool_call(self, request, handler):
+        with trace_span(f"tool.{request.tool_call['name']}", tool_call_id=request.tool_call.get("id")):
+            return await handler(request)
+
+
+def _model_name(model):
+    return getattr(model, "model_name", None) or getattr(model, "model", None) or type(model).__name__
+
+
+def format_waterfall(spans, width=24):
+    """
+    trace의 span을 시작 순서대로 막대 그래프 텍스트로 표시
+    예)
+    agent.turn          ████████████████████████ 41.20s
+      model.call        ███                       4.10s
+      tool.exec_query      █████████████████     29.80s
+    """
+    if not spans:
+        return ""
+    started_at = min(span["start"] for span in spans)
+    total = max(max(span["end"] for span in spans) - started_at, 1)
+    parents = {span["span_id"]: span["parent_id"] for span in spans}
+
+    def depth(span):
+        level, parent_id = 0, span["parent_id"]
+        while parent_id in parents:
+            level, parent_id = level + 1, parents[parent_id]
+        return level
+
+    rows = []
+    for span in sorted(spans, key=lambda span: span["start"]):
+        offset = int((span["start"] - started_at) / total * width)
+        length = max(1, round((span["end"] - span["start"]) / total * width))
+        bar = (" " * offset + "█" * length)[:width]
+        rows.append(("  " * depth(span) + span["name"], bar, (span["end"] - span["start"]) / 1e9))
+    label_width = max(len(label) for label, _, _ in rows)
+    return "\n".join(
+        f"{label:<{label_width}} {bar:<{width}} {seconds:6.2f}s" for label, bar, seconds in rows
+    )
@@ -1,15 +1,32 @@
+import os
+import re
+import json
+import time
+import functools
+import hashlib
+import tempfile
+import threading
+import contextvars
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+import pyarrow.parquet as pq
 import streamlit as st
-from typing import Optional
-from google.cloud import bigquery
-from google.oauth2 import service_account
-from langchain_core.tools import Tool, StructuredTool
+from typing import TYPE_CHECKING, Callable, List, Literal, Optional, Union
+from langchain_core.tools import StructuredTool
+from langgraph.config import get_stream_writer
 from pydantic import BaseModel, Field
 from src.code_interpreter import CodeInterpreterClient
+from src.tracing import trace_span
+
+if TYPE_CHECKING:
+    from google.cloud import bigquery
 
 
 class SqlTableInfoInput(BaseModel):
-    table_name: str = Field()
+    table_names: List[str] = Field(description="스키마와 샘플 데이터를 확인할 테이블명 목록")
 
 
 class ExecSqlInput(BaseModel):
@@ -17,6 +34,634 @@ class ExecSqlInput(BaseModel):
     limit: Optional[int] = Field(default=None)
 
 
+class AggregationMeasure(BaseModel):
+    column: str = Field(description="집계할 컬럼명 (COUNT에서는 '*' 사용 가능)")
+    agg: Literal["COUNT", "COUNT_DISTINCT", "SUM", "AVG", "MIN", "MAX"] = Field()
+    alias: Optional[str] = Field(default=None, description="결과 컬럼명 (기본값: <agg>_<column>)")
+
+
+class AggregationFilter(BaseModel):
+    column: str = Field()
+    op: Literal["=", "!=", "<", "<=", ">", ">=", "IN", "NOT IN", "LIKE"] = Field()
+    value: Union[str, int, float, bool, List[Union[str, int, float]]] = Field(
+        description="비교할 값 (IN / NOT IN은 리스트)"
+    )
+
+
+class TimeBucket(BaseModel):
+    column: str = Field(description="DATE / DATETIME / TIMESTAMP 컬럼명")
+    granularity: Literal["DAY", "WEEK", "MONTH", "QUARTER", "YEAR"] = Field()
+
+
+class AggregateQueryInput(BaseModel):
+    table_name: str = Field()
+    measures: List[AggregationMeasure] = Field(min_length=1)
+    dimensions: List[str] = Field(default_factory=list, description="GROUP BY할 컬럼명 목록")
+    filters: List[AggregationFilter] = Field(default_factory=list, description="AND로 결합되는 조건")
+    time_bucket: Optional[TimeBucket] = Field(default=None)
+    order_by: Optional[str] = Field(
+        default=None,
+        description=(
+            "내림차순 정렬 기준 (measure alias 또는 dimension). "
+            "time bucket alias(<column>_<granularity>, 예: week_week)를 지정하면 시간순(오름차순)으로 정렬"
+        ),
+    )
+    top_n: Optional[int] = Field(
+        default=None,
+        description="time bucket과 top_n_partition_by 그룹별로 order_by 기준 상위 N개만 반환",
+    )
+    top_n_partition_by: List[str] = Field(default_factory=list)
+    limit: Optional[int] = Field(default=1000)
+
+
+class CatalogLookupError(str):
+    """테이블 하나의 카탈로그 조회 실패 메시지. tool 결과에는 표시하지만 TableCatalogCache에 저장하지 않음"""
+
+
+class TableCatalogCache:
+    """
+    project/dataset 단위로 테이블 목록, 스키마, 샘플 데이터를 보관하는 프로세스 공용 캐시
+
+    Streamlit은 입력이 있을 때마다 스크립트를 다시 실행하므로, 카탈로그 정보를
+    세션과 rerun에 걸쳐 재사용하여 INFORMATION_SCHEMA 조회를 한 번으로 줄입니다.
+    TTL이 지난 항목은 기존 값을 그대로 반환하면서 백그라운드 스레드에서 갱신합니다.
+    """
+
+    def __init__(self, ttl_seconds: float = 3600):
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._entries = {}  # key -> (value, fetched_at)
+        self._refreshing = set()
+        self._lock = threading.Lock()
+
+    def get(self, key: tuple, loader: Callable):
+        """캐시에 있으면 그대로 반환하고, 없으면 loader를 호출하여 채움"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self.hits += 1
+                value, fetched_at = entry
+                expired = time.monotonic() - fetched_at > self.ttl_seconds
+                if expired and key not in self._refreshing:
+                    self._refreshing.add(key)
+                    threading.Thread(
+                        target=self._refresh, args=(key, loader), daemon=True
+                    ).start()
+                return value
+            self.misses += 1
+
+        value = loader()
+        with self._lock:
+            self._entries[key] = (value, time.monotonic())
+        return value
+
+    def get_many(self, keys: list, loader: Callable) -> dict:
+        """
+        여러 key를 한 번에 조회. 캐시에 없는 key 목록만 loader에 넘겨 한 번에 채움
+        loader는 key 목록을 받아 {key: value} dict를 반환해야 함
+        """
+        values = {}
+        missing = []
+        expired = []
+        with self._lock:
+            for key in keys:
+                entry = self._entries.get(key)
+                if entry is None:
+                    self.misses += 1
+                    missing.append(key)
+                    continue
+                self.hits += 1
+                value, fetched_at = entry
+                values[key] = value
+                if (
+                    time.monotonic() - fetched_at > self.ttl_seconds
+                    and key not in self._refreshing
+                ):
+                    self._refreshing.add(key)
+                    expired.append(key)
+        if expired:
+            threading.Thread(
+                target=self._refresh_many, args=(expired, loader), daemon=True
+            ).start()
+
+        if missing:
+            loaded = loader(missing)
+            with self._lock:
+                for key, value in loaded.items():
+                    if not isinstance(value, CatalogLookupError):
+                        self._entries[key] = (value, time.monotonic())
+            values.update(loaded)
+        return values
+
+    def _refresh(self, key: tuple, loader: Callable) -> None:
+        """백그라운드 갱신. 실패하면 기존 값을 유지하고 다음 조회 때 다시 시도"""
+        try:
+            value = loader()
+            with self._lock:
+                self._entries[key] = (value, time.monotonic())
+        except Exception as e:
+            print(f"Catalog refresh failed for {key}: {e}")
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def _refresh_many(self, keys: list, loader: Callable) -> None:
+        try:
+            loaded = loader(keys)
+            with self._lock:
+                for key, value in loaded.items():
+                    # 조회에 실패한 테이블은 기존 값을 유지
+                    if not isinstance(value, CatalogLookupError):
+                        self._entries[key] = (value, time.monotonic())
+        except Exception as e:
+            print(f"Catalog refresh failed for {keys}: {e}")
+        finally:
+            with self._lock:
+                self._refreshing.difference_update(keys)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": len(self._entries),
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+# 모든 세션이 공유하는 카탈로그 캐시
+table_catalog_cache = TableCatalogCache()
+
+
+# 문자열/식별자 리터럴은 그대로 두고, 주석과 연속된 공백만 하나의 공백으로 치환
+_SQL_TOKEN_PATTERN = re.compile(
+    r"""('(?:[^'\\]|\\.)*'|"(?:[^"\\]|\\.)*"|`[^`]*`)"""
+    r"""|((?:\s|--[^\n]*|#[^\n]*|/\*.*?\*/)+)""",
+    re.DOTALL,
+)
+
+
+def normalize_sql(query: str) -> str:
+    """캐시 키로 사용하기 위해 SQL에서 주석, 공백 차이, 끝의 세미콜론을 제거"""
+    normalized = _SQL_TOKEN_PATTERN.sub(
+        lambda m: m.group(1) if m.group(1) is not None else " ", query
+    )
+    return normalized.strip().rstrip(";").strip()
+
+
+# 이 시간 동안 수정되지 않은 캐시 임시 파일(QueryResultCacheWriter가 기록하던 파일)은 비정상 종료로 남은 것으로 보고 삭제
+STALE_CACHE_TMP_SECONDS = 3600
+
+
+class QueryResultCache:
+    """
+    정규화된 SQL을 키로 쿼리 결과를 로컬 디스크에 Parquet로 저장하는 캐시
+
+    같은 SQL(공백, 주석 차이 포함)이 다시 실행되면 BigQuery를 거치지 않고
+    디스크에서 바로 DataFrame을 읽어옵니다.
+    - TTL이 지난 결과는 사용하지 않고 삭제
+    - 전체 크기가 max_bytes를 넘으면 가장 오래 사용하지 않은 결과부터 삭제 (LRU)
+    """
+
+    def __init__(
+        self,
+        cache_dir: str = "./cache/bigquery/",
+        max_bytes: int = 512 * 1024 * 1024,
+        ttl_seconds: float = 6 * 3600,
+    ):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # key -> (file_path, nbytes, stored_at)
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self._load_existing_entries()
+
+    def _load_existing_entries(self) -> None:
+        """
+        프로세스 재시작 후에도 디스크에 남아 있는 결과를 재사용
+        TTL이 지난 결과와 비정상 종료로 남은 기록 중 파일(*.tmp)은 삭제하고, max_bytes를 넘으면 오래된 결과부터 삭제
+        """
+        now = time.time()
+        paths = []
+        for name in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            age = now - stat.st_mtime
+            # 다른 프로세스가 기록 중일 수 있으므로 한동안 수정되지 않은 임시 파일만 삭제
+            expired_tmp = name.endswith(".tmp") and age > STALE_CACHE_TMP_SECONDS
+            if expired_tmp or (name.endswith(".parquet") and age > self.ttl_seconds):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            elif name.endswith(".parquet"):
+                paths.append((path, stat))
+        for path, stat in sorted(paths, key=lambda item: item[1].st_mtime):
+            key = os.path.basename(path)[: -len(".parquet")]
+            # mtime은 wall clock 기준이므로 monotonic 기준으로 환산
+            age = now - stat.st_mtime
+            self._entries[key] = (path, stat.st_size, time.monotonic() - age)
+            self._total_bytes += stat.st_size
+        while self._total_bytes > self.max_bytes and self._entries:
+            self._remove(next(iter(self._entries)))
+
+    @staticmethod
+    def make_key(query: str, limit: Optional[int] = None) -> str:
+        return hashlib.sha256(
+            f"{normalize_sql(query)}\nLIMIT {limit}".encode("utf-8")
+        ).hexdigest()
+
+    @staticmethod
+    def is_cacheable(query: str) -> bool:
+        """조회 쿼리(SELECT/WITH)만 캐시"""
+        return re.match(r"(SELECT|WITH)\b", normalize_sql(query), re.IGNORECASE) is not None
+
+    def get(self, key: str) -> Optional[pd.DataFrame]:
+        """캐시된 결과를 DataFrame으로 반환 (작은 결과용. 큰 결과는 get_path로 batch 단위로 읽음)"""
+        path = self.get_path(key)
+        if path is None:
+            return None
+        try:
+            return pd.read_parquet(path)
+        except Exception as e:
+            print(f"Query cache read failed ({path}): {e}")
+            self.discard(key)
+            return None
+
+    def get_path(self, key: str) -> Optional[str]:
+        """
+        캐시된 결과의 Parquet 파일 경로를 반환 (없거나 TTL이 지났으면 None)
+        결과 전체를 메모리에 올리지 않고 pq.ParquetFile(path).iter_batches()로 읽을 수 있음
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            path, _, stored_at = entry
+            if time.monotonic() - stored_at > self.ttl_seconds:
+                self._remove(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return path
+
+    def discard(self, key: str) -> None:
+        """get_path로 받은 파일을 읽지 못했을 때 호출. 항목을 삭제하고 hit를 miss로 정정"""
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self.hits -= 1
+            self.misses += 1
+
+    def put(self, key: str, df: pd.DataFrame) -> None:
+        path = os.path.join(self.cache_dir, f"{key}.parquet")
+        try:
+            df.to_parquet(path, compression="zstd")
+        except Exception as e:
+            # 일부 dtype은 Parquet로 변환할 수 없으므로 캐시하지 않고 넘어감
+            print(f"Query cache write skipped: {e}")
+            return
+        self._register(key, path)
+
+    def open_writer(self, key: str) -> "QueryResultCacheWriter":
+        """RecordBatch 단위로 결과를 기록하는 writer (스트리밍 다운로드 결과를 그대로 캐시)"""
+        return QueryResultCacheWriter(self, key)
+
+    def add_file(self, key: str, tmp_path: str) -> None:
+        """기록이 끝난 임시 Parquet 파일을 캐시 항목으로 등록"""
+        path = os.path.join(self.cache_dir, f"{key}.parquet")
+        os.replace(tmp_path, path)
+        self._register(key, path)
+
+    def _register(self, key: str, path: str) -> None:
+        nbytes = os.path.getsize(path)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key, delete_file=False)
+            self._entries[key] = (path, nbytes, time.monotonic())
+            self._total_bytes += nbytes
+            while self._total_bytes > self.max_bytes and len(self._entries) > 1:
+                oldest_key = next(iter(self._entries))
+                self._remove(oldest_key)
+
+    def _remove(self, key: str, delete_file: bool = True) -> None:
+        """lock을 잡은 상태에서 호출"""
+        path, nbytes, _ = self._entries.pop(key)
+        self._total_bytes -= nbytes
+        if delete_file:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": len(self._entries),
+                "bytes": self._total_bytes,
+            }
+
+
+def _iter_parquet_batches(parquet_file: "pq.ParquetFile", batch_size: int):
+    """Parquet 파일을 batch 단위로 읽음. 0행이면 열 정보를 유지하도록 빈 batch 하나를 반환"""
+    empty = True
+    for batch in parquet_file.iter_batches(batch_size=batch_size):
+        empty = False
+        yield batch
+    if empty:
+        yield pa.RecordBatch.from_pylist([], schema=parquet_file.schema_arrow)
+
+
+class QueryResultCacheWriter:
+    """
+    Code Interpreter로 보내는 RecordBatch를 캐시용 Parquet 파일에도 함께 기록 (tee)
+    모든 batch를 기록한 뒤 commit()해야 캐시에 등록되며, 기록에 실패하면 캐시하지 않고 넘어감
+    """
+
+    def __init__(self, cache: QueryResultCache, key: str):
+        self._cache = cache
+        self._key = key
+        # 기록 중인 파일은 .parquet로 끝나지 않으므로 다른 프로세스가 캐시로 읽지 않음
+        fd, self._tmp_path = tempfile.mkstemp(prefix=f"{key}.", suffix=".tmp", dir=cache.cache_dir)
+        os.close(fd)
+        self._writer = None
+        self._failed = False
+
+    def write_batch(self, batch: pa.RecordBatch) -> None:
+        if self._failed:
+            return
+        try:
+            if self._writer is None:
+                self._writer = pq.ParquetWriter(self._tmp_path, batch.schema, compression="zstd")
+            self._writer.write_batch(batch)
+        except Exception as e:
+            print(f"Query cache write skipped: {e}")
+            self.abort()
+
+    def commit(self, schema: pa.Schema) -> None:
+        if self._failed:
+            return
+        try:
+            if self._writer is None:
+                # 결과가 0행이어도 schema만 있는 파일로 캐시
+                self._writer = pq.ParquetWriter(self._tmp_path, schema, compression="zstd")
+            self._writer.close()
+            self._cache.add_file(self._key, self._tmp_path)
+        except Exception as e:
+            print(f"Query cache write skipped: {e}")
+            self.abort()
+
+    def abort(self) -> None:
+        self._failed = True
+        if self._writer is not None:
+            try:
+                self._writer.close()
+            except Exception:
+                pass
+        try:
+            os.remove(self._tmp_path)
+        except OSError:
+            pass
+
+
+# 모든 세션이 공유하는 쿼리 결과 캐시
+query_result_cache = QueryResultCache()
+
+
+# Code Interpreter로 결과를 전달할 때 사용할 수 있는 파일 형식
+# format -> (확장자, Code Interpreter에서 읽는 방법)
+TRANSFER_FORMATS = {
+    "parquet": (".parquet", "pd.read_parquet({path})"),
+    "arrow": (".arrow", "pyarrow.ipc.open_file({path}).read_pandas()"),
+    "csv": (".csv", "pd.read_csv({path})"),
+}
+
+
+def _open_arrow_writer(transfer_format: str, sink, schema: pa.Schema):
+    """transfer_format에 맞는 Arrow writer를 생성 (write_batch / close 지원)"""
+    if transfer_format == "parquet":
+        return pq.ParquetWriter(sink, schema, compression="zstd")
+    if transfer_format == "arrow":
+        return pa.ipc.new_file(sink, schema)
+    if transfer_format == "csv":
+        return pa_csv.CSVWriter(sink, schema)
+    raise ValueError(f"Unsupported transfer format: {transfer_format}")
+
+
+def format_bytes(num_bytes: float) -> str:
+    for unit in ("B", "KB", "MB", "GB"):
+        if num_bytes < 1024:
+            return f"{num_bytes:.1f} {unit}"
+        num_bytes /= 1024
+    return f"{num_bytes:.1f} TB"
+
+
+class QueryBudgetExceededError(Exception):
+    """dry run으로 추정한 스캔 바이트가 예산을 넘는 경우"""
+
+
+class QueryBudget:
+    """
+    BigQuery 스캔 바이트 예산 (쿼리당 / 세션당)
+
+    exec_query 실행 전에 dry run으로 스캔량을 추정하여 예산을 넘는 쿼리는 거부하고,
+    실제로 처리한 바이트를 누적하여 세션 전체의 사용량을 제한합니다.
+    대화 단위로 유지해야 하므로 st.session_state에 보관합니다.
+
+    여러 tool 호출이 동시에 실행될 수 있으므로, 예산 확인과 추정 바이트 예약을 lock 안에서
+    한 번에 처리(reserve)하고, 쿼리가 끝나면 예약을 실제 처리 바이트로 정산(settle)합니다.
+    """
+
+    # on-demand 요금 (USD / TiB)
+    PRICE_PER_TIB = 6.25
+
+    def __init__(
+        self,
+        max_bytes_per_query: int = 10 * 1024**3,
+        max_bytes_per_session: int = 50 * 1024**3,
+    ):
+        self.max_bytes_per_query = max_bytes_per_query
+        self.max_bytes_per_session = max_bytes_per_session
+        self.bytes_processed = 0
+        # 실행 중인 쿼리가 예약한 추정 바이트 (정산 전)
+        self.bytes_reserved = 0
+        self._lock = threading.Lock()
+
+    @property
+    def remaining_bytes(self) -> int:
+        return max(self.max_bytes_per_session - self.bytes_processed - self.bytes_reserved, 0)
+
+    def reserve(self, estimated_bytes: int) -> None:
+        """예산 안이면 추정 바이트를 예약하고, 넘으면 QueryBudgetExceededError"""
+        if estimated_bytes > self.max_bytes_per_query:
+            raise QueryBudgetExceededError(
+                f"estimated {format_bytes(estimated_bytes)} exceeds the per-query budget "
+                f"of {format_bytes(self.max_bytes_per_query)}"
+            )
+        with self._lock:
+            if estimated_bytes > self.remaining_bytes:
+                raise QueryBudgetExceededError(
+                    f"estimated {format_bytes(estimated_bytes)} exceeds the remaining session budget "
+                    f"of {format_bytes(self.remaining_bytes)}"
+                )
+            self.bytes_reserved += estimated_bytes
+
+    def settle(self, reserved_bytes: int, bytes_processed: int) -> None:
+        """reserve한 바이트를 해제하고 실제 처리 바이트를 누적 (실패한 쿼리도 처리한 만큼 누적)"""
+        with self._lock:
+            self.bytes_reserved -= reserved_bytes
+            self.bytes_processed += bytes_processed or 0
+
+    @classmethod
+    def estimate_cost(cls, num_bytes: int) -> float:
+        return num_bytes / 1024**4 * cls.PRICE_PER_TIB
+
+
+_IDENTIFIER_PATTERN = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+
+def _sql_literal(value) -> str:
+    """집계 스펙의 필터 값을 BigQuery SQL 리터럴로 변환"""
+    if isinstance(value, bool):
+        return "TRUE" if value else "FALSE"
+    if isinstance(value, (int, float)):
+        return repr(value)
+    if isinstance(value, list):
+        return "(" + ", ".join(_sql_literal(v) for v in value) + ")"
+    escaped = str(value).replace("\\", "\\\\").replace("'", "\\'")
+    return f"'{escaped}'"
+
+
+class QueryCancelledError(Exception):
+    """사용자가 실행 중인 BigQuery job을 취소한 경우"""
+
+
+class QueryTimeoutError(Exception):
+    """BigQuery job이 제한 시간 안에 끝나지 않아 취소한 경우"""
+
+
+class QueryJobTracker:
+    """
+    세션에서 실행 중인 BigQuery job을 추적하여 진행 상황 조회와 취소를 지원
+
+    job은 LangGraph의 tool 스레드에서 실행되고 "Stop" 버튼은 Streamlit rerun에서
+    처리되므로, rerun 사이에 유지되도록 st.session_state에 보관합니다.
+    """
+
+    def __init__(self):
+        self._jobs = {}  # job_id -> QueryJob
+        self._cancelled_job_ids = set()
+        self._progress = {}  # job_id -> 마지막으로 확인한 진행 상황
+        self._lock = threading.Lock()
+
+    def register(self, job) -> None:
+        with self._lock:
+            self._jobs[job.job_id] = job
+
+    def unregister(self, job) -> None:
+        with self._lock:
+            self._jobs.pop(job.job_id, None)
+            self._progress.pop(job.job_id, None)
+            self._cancelled_job_ids.discard(job.job_id)
+
+    def update_progress(self, progress: dict) -> None:
+        with self._lock:
+            self._progress[progress["job_id"]] = progress
+
+    def active_progress(self) -> list:
+        with self._lock:
+            return list(self._progress.values())
+
+    def is_cancelled(self, job_id: str) -> bool:
+        with self._lock:
+            return job_id in self._cancelled_job_ids
+
+    def cancel_all(self) -> int:
+        """실행 중인 모든 job에 취소를 요청하고 요청한 job 수를 반환"""
+        with self._lock:
+            jobs = list(self._jobs.values())
+            self._cancelled_job_ids.update(job.job_id for job in jobs)
+        for job in jobs:
+            try:
+                job.cancel()
+            except Exception as e:
+                print(f"Failed to cancel BigQuery job {job.job_id}: {e}")
+        return len(jobs)
+
+
+def format_job_progress(progress: dict) -> str:
+    stages = ""
+    if progress["stages_total"]:
+        stages = f", stage {progress['stages_completed']}/{progress['stages_total']}"
+    return (
+        f"BigQuery job {progress['state']}{stages}, "
+        f"{format_bytes(progress['bytes_processed'])} processed, "
+        f"{progress['elapsed_seconds']:.0f}s elapsed"
+    )
+
+
+def _report_progress(progress: dict) -> None:
+    """stream_mode="custom"으로 실행 중이면 진행 상황을 채팅 화면으로 전달"""
+    try:
+        writer = get_stream_writer()
+    except RuntimeError:
+        # LangGraph 실행 컨텍스트 밖에서 호출된 경우
+        return
+    writer({"type": "bigquery_progress", **progress})
+
+
+def _bigquery():
+    """
+    google.cloud.bigquery는 import가 느리므로 페이지 로드 시점이 아니라 처음 사용할 때 import
+    (두 번째부터는 sys.modules에 있는 모듈을 바로 반환)
+    """
+    from google.cloud import bigquery
+
+    return bigquery
+
+
+@st.cache_resource
+def _get_credentials():
+    """인증 정보 파싱은 프로세스당 한 번만 수행"""
+    from google.oauth2 import service_account
+
+    return service_account.Credentials.from_service_account_info(
+        st.secrets["gcp_service_account"]
+    )
+
+
+@st.cache_resource
+def _get_bigquery_client(project_id: str) -> "bigquery.Client":
+    return _bigquery().Client(credentials=_get_credentials(), project=project_id)
+
+
+@st.cache_resource
+def _get_bigquery_storage_client():
+    """대용량 결과를 스트리밍하기 위한 Storage Read API client (설치되어 있지 않으면 None)"""
+    try:
+        from google.cloud import bigquery_storage
+    except ImportError:  # Storage Read API를 사용할 수 없으면 REST API로 페이지 단위 조회
+        return None
+    return bigquery_storage.BigQueryReadClient(credentials=_get_credentials())
+
+
 class BigQueryClient:
     def __init__(
         self,
@@ -29,51 +674,314 @@ class BigQueryClient:
         # 주차(week), 점수(score), 검색어(term) 등
         dataset_project_id: str = "bigquery-public-data",
         dataset_id: str = "google_trends",
+        upload_chunk_rows: int = 100_000,
+        spool_max_bytes: int = 64 * 1024 * 1024,
+        transfer_format: str = "parquet",
+        budget: Optional[QueryBudget] = None,
+        job_tracker: Optional[QueryJobTracker] = None,
+        query_timeout_seconds: float = 300,
+        poll_interval_seconds: float = 1.0,
+        max_concurrent_tool_calls: int = 4,
     ) -> None:
-        credentials = service_account.Credentials.from_service_account_info(
-            st.secrets["gcp_service_account"]
-        )
-        self.client = bigquery.Client(credentials=credentials, project=project_id)
+        if transfer_format not in TRANSFER_FORMATS:
+            raise ValueError(f"Unsupported transfer format: {transfer_format}")
+        self.project_id = project_id
         self.dataset_project_id = dataset_project_id
         self.dataset_id = dataset_id
+        # 결과 업로드 시 한 번에 메모리에 올리는 최대 행 수
+        self.upload_chunk_rows = upload_chunk_rows
+        # 이 크기를 넘으면 임시 파일을 메모리 대신 디스크에 기록
+        self.spool_max_bytes = spool_max_bytes
+        # Code Interpreter로 결과를 전달할 파일 형식 (TRANSFER_FORMATS 참조)
+        self.transfer_format = transfer_format
+        # exec_query로 실행하는 쿼리의 스캔 바이트 예산
+        self.budget = budget if budget is not None else QueryBudget()
+        # 실행 중인 job의 진행 상황 조회 / 취소용
+        self.job_tracker = job_tracker if job_tracker is not None else QueryJobTracker()
+        self.query_timeout_seconds = query_timeout_seconds
+        self.poll_interval_seconds = poll_interval_seconds
+        # 모델이 한 step에서 여러 tool을 호출하면 동시에 실행되므로, 세션당 동시 실행 수를 제한
+        # (BigQuery 동시 쿼리 quota 보호)
+        self._tool_slots = threading.BoundedSemaphore(max_concurrent_tool_calls)
         self.table_names_str = self._fetch_table_names()
         self.code_interpreter = code_interpreter
 
+    @property
+    def client(self) -> "bigquery.Client":
+        """BigQuery client는 처음 사용할 때 생성 (st.cache_resource로 프로세스에서 공유)"""
+        return _get_bigquery_client(self.project_id)
+
+    def _limit_concurrency(self, func: Callable) -> Callable:
+        """세션의 동시 실행 수 제한(_tool_slots)을 적용한 함수로 감쌈"""
+
+        @functools.wraps(func)
+        def limited(*args, **kwargs):
+            with self._tool_slots:
+                return func(*args, **kwargs)
+
+        return limited
+
+    def _catalog_key(self, *parts) -> tuple:
+        return (self.dataset_project_id, self.dataset_id, *parts)
+
     def _fetch_table_names(self) -> str:
         """
         BigQuery에서 이용 가능한 테이블명을 가져옴
-        쉼표로 구분된 문자열로 반환
+        쉼표로 구분된 문자열로 반환 (table_catalog_cache에 캐시됨)
         """
         query = f"""
         SELECT table_name
         FROM `{self.dataset_project_id}.{self.dataset_id}.INFORMATION_SCHEMA.TABLES`
         """
-        table_names = self._exec_query(query).table_name.tolist()
-        return ", ".join(table_names)
+        return table_catalog_cache.get(
+            self._catalog_key("tables"),
+            lambda: ", ".join(self._exec_query(query, use_cache=False).table_name.tolist()),
+        )
+
+    def _exec_query(self, query: str, limit: int = None, use_cache: bool = True) -> pd.DataFrame:
+        """
+        SQL을 실행하여 Pandas DataFrame으로 반환
+        같은 SQL의 결과가 query_result_cache에 있으면 BigQuery를 호출하지 않음
+        use_cache=False이면 query_result_cache를 읽지도 쓰지도 않음
+        (테이블 목록 / 스키마 / 샘플은 table_catalog_cache가 TTL로 관리하므로, 갱신할 때 최신 값을 조회)
+        """
+        cacheable = use_cache and QueryResultCache.is_cacheable(query)
+        if cacheable:
+            cache_key = QueryResultCache.make_key(query, limit)
+            df = query_result_cache.get(cache_key)
+            if df is not None:
+                return df
+
+        if limit is not None:
+            query += f"\nLIMIT {limit}"
+        with trace_span("bigquery.query") as span:
+            query_job = self.client.query(query)
+            span.set_attribute("job_id", query_job.job_id)
+            df = query_job.result().to_dataframe(create_bqstorage_client=True)
+            span.set_attribute("rows", len(df))
+
+        if cacheable:
+            query_result_cache.put(cache_key, df)
+        return df
+
+    def _dry_run(self, query: str) -> int:
+        """쿼리를 실제로 실행하지 않고 스캔할 바이트 수를 추정"""
+        job_config = _bigquery().QueryJobConfig(dry_run=True, use_query_cache=False)
+        with trace_span("bigquery.dry_run") as span:
+            estimated_bytes = self.client.query(query, job_config=job_config).total_bytes_processed
+            span.set_attribute("estimated_bytes", estimated_bytes or 0)
+        return estimated_bytes
+
+    def submit_query(self, query: str, job_config=None) -> "bigquery.QueryJob":
+        """job을 제출만 하고 완료를 기다리지 않음 (job_tracker에 등록)"""
+        with trace_span("bigquery.job_submit") as span:
+            query_job = self.client.query(query, job_config=job_config)
+            span.set_attribute("job_id", query_job.job_id)
+        self.job_tracker.register(query_job)
+        return query_job
+
+    def get_job_progress(self, query_job: "bigquery.QueryJob") -> dict:
+        """job 상태를 다시 읽어 stage / 처리 바이트 단위의 진행 상황을 반환"""
+        query_job.reload()
+        stages = query_job.query_plan or []
+        started = query_job.started or query_job.created
+        elapsed = time.time() - started.timestamp() if started else 0
+        return {
+            "job_id": query_job.job_id,
+            "state": query_job.state,
+            "stages_completed": sum(1 for stage in stages if stage.status == "COMPLETE"),
+            "stages_total": len(stages),
+            "bytes_processed": query_job.total_bytes_processed or 0,
+            "elapsed_seconds": elapsed,
+        }
+
+    def cancel_query(self, query_job: "bigquery.QueryJob") -> bool:
+        return query_job.cancel()
+
+    def wait_for_query(self, query_job: "bigquery.QueryJob", timeout: float = None) -> None:
+        """
+        job이 끝날 때까지 poll_interval_seconds 간격으로 진행 상황을 보고
+        사용자가 취소하면 QueryCancelledError, 제한 시간을 넘기면 job을 취소하고
+        QueryTimeoutError를 발생시킴
+        """
+        timeout = self.query_timeout_seconds if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+        with trace_span("bigquery.job_wait", job_id=query_job.job_id):
+            try:
+                # poll마다 reload는 한 번만 하고, 완료 여부와 진행 상황 모두 그 상태를 사용
+                while True:
+                    progress = self.get_job_progress(query_job)
+                    if progress["state"] == "DONE":
+                        break
+                    if self.job_tracker.is_cancelled(query_job.job_id):
+                        raise QueryCancelledError(f"job {query_job.job_id} was cancelled")
+                    if time.monotonic() > deadline:
+                        self.cancel_query(query_job)
+                        raise QueryTimeoutError(
+                            f"job {query_job.job_id} did not finish within {timeout:.0f}s and was cancelled"
+                        )
+                    self.job_tracker.update_progress(progress)
+                    _report_progress(progress)
+                    time.sleep(self.poll_interval_seconds)
+                if self.job_tracker.is_cancelled(query_job.job_id):
+                    raise QueryCancelledError(f"job {query_job.job_id} was cancelled")
+            finally:
+                self.job_tracker.unregister(query_job)
+
+    def _open_record_batches(self, query: str, limit: int = None):
+        """
+        SQL 결과를 upload_chunk_rows 단위의 Arrow RecordBatch로 읽을 수 있는 iterable을 반환
+        - 캐시에 결과가 있으면 BigQuery를 호출하지 않고 캐시된 결과를 사용
+        - 없으면 dry run으로 스캔량을 추정하여 예산을 확인한 뒤 실행
+          (결과는 _write_query_result에서 다운로드하면서 캐시에 함께 기록)
+
+        Returns:
+            tuple: (batches, query_job, estimated_bytes)
+                캐시 hit인 경우 query_job은 None, estimated_bytes는 0
+        """
+        if QueryResultCache.is_cacheable(query):
+            cache_key = QueryResultCache.make_key(query, limit)
+            cache_path = query_result_cache.get_path(cache_key)
+            if cache_path is not None:
+                try:
+                    # 캐시된 결과도 batch 단위로 읽어 결과 크기와 관계없이 메모리 사용량을 일정하게 유지
+                    parquet_file = pq.ParquetFile(cache_path)
+                    return _iter_parquet_batches(parquet_file, self.upload_chunk_rows), None, 0
+                except Exception as e:
+                    print(f"Query cache read failed ({cache_path}): {e}")
+                    query_result_cache.discard(cache_key)
 
-    def _exec_query(self, query: str, limit: int = None) -> pd.DataFrame:
-        """SQL을 실행하여 Pandas DataFrame으로 반환"""
         if limit is not None:
             query += f"\nLIMIT {limit}"
-        query_job = self.client.query(query)
-        return query_job.result().to_dataframe(create_bqstorage_client=True)
+        estimated_bytes = self._dry_run(query)
+        # 예약한 바이트는 _write_query_result에서 결과를 받은 뒤 정산
+        self.budget.reserve(estimated_bytes)
+        query_job = None
+        try:
+            # 추정이 빗나가더라도 쿼리당 예산 이상은 과금되지 않도록 제한
+            job_config = _bigquery().QueryJobConfig(
+                maximum_bytes_billed=self.budget.max_bytes_per_query
+            )
+            query_job = self.submit_query(query, job_config=job_config)
+            self.wait_for_query(query_job)
+            rows = query_job.result(page_size=self.upload_chunk_rows)
+            batches = rows.to_arrow_iterable(bqstorage_client=_get_bigquery_storage_client())
+        except Exception:
+            self.budget.settle(estimated_bytes, query_job.total_bytes_processed if query_job else 0)
+            raise
+        return batches, query_job, estimated_bytes
+
+    def _write_query_result(self, query: str, limit: int = None):
+        """
+        SQL 결과를 RecordBatch 단위로 transfer_format 형식의 임시 파일에 기록
+        전체 결과를 메모리에 올리지 않으므로 결과 크기와 관계없이 메모리 사용량이 일정함
+
+        Returns:
+            tuple: (file, sample_df, schema, row_count, bytes_stats)
+        """
+        batches, query_job, estimated_bytes = self._open_record_batches(query, limit)
+        cache_writer = None
+        if query_job is not None and QueryResultCache.is_cacheable(query):
+            cache_writer = query_result_cache.open_writer(QueryResultCache.make_key(query, limit))
+        spool = tempfile.SpooledTemporaryFile(max_size=self.spool_max_bytes, mode="w+b")
+        writer = None
+        sample_df = None
+        schema = pa.schema([])
+        row_count = 0
+        # 다운로드와 인코딩은 batch 단위로 번갈아 실행되므로, 인코딩에 걸린 시간은 attribute로 기록
+        encode_seconds = 0.0
+        try:
+            with trace_span("bigquery.download", format=self.transfer_format, cache_hit=query_job is None) as span:
+                for batch in batches:
+                    started_at = time.perf_counter()
+                    if writer is None:
+                        schema = batch.schema
+                        writer = _open_arrow_writer(self.transfer_format, spool, schema)
+                        sample_df = batch.slice(0, 5).to_pandas()
+                    writer.write_batch(batch)
+                    if cache_writer is not None:
+                        cache_writer.write_batch(batch)
+                    encode_seconds += time.perf_counter() - started_at
+                    row_count += batch.num_rows
+                if writer is None:
+                    # 결과가 0행이어도 Code Interpreter에서 읽을 수 있는 파일을 만듦
+                    writer = _open_arrow_writer(self.transfer_format, spool, schema)
+                writer.close()
+                if cache_writer is not None:
+                    cache_writer.commit(schema)
+                span.set_attribute("rows", row_count)
+                span.set_attribute("bytes", spool.tell())
+                span.set_attribute("encode_seconds", encode_seconds)
+        except Exception:
+            if cache_writer is not None:
+                cache_writer.abort()
+            spool.close()
+            self.budget.settle(estimated_bytes, query_job.total_bytes_processed if query_job else 0)
+            raise
+        if sample_df is None:
+            sample_df = pd.DataFrame()
+        spool.seek(0)
+
+        bytes_processed = query_job.total_bytes_processed if query_job else 0
+        self.budget.settle(estimated_bytes, bytes_processed)
+        bytes_stats = {
+            "cache_hit": query_job is None,
+            "estimated_bytes": estimated_bytes,
+            "bytes_processed": bytes_processed or 0,
+            "slot_millis": query_job.slot_millis if query_job else 0,
+        }
+        return spool, sample_df, schema, row_count, bytes_stats
+
+    def _format_bytes_stats(self, bytes_stats: dict) -> str:
+        if bytes_stats["cache_hit"]:
+            return "bytes processed: 0 B (served from local result cache)"
+        return (
+            f"bytes processed: {format_bytes(bytes_stats['bytes_processed'])} "
+            f"(dry-run estimate {format_bytes(bytes_stats['estimated_bytes'])}, "
+            f"~${QueryBudget.estimate_cost(bytes_stats['bytes_processed']):.4f}, "
+            f"slot time {(bytes_stats['slot_millis'] or 0) / 1000:.1f}s), "
+            f"session budget remaining: {format_bytes(self.budget.remaining_bytes)}"
+        )
 
     def exec_query_and_upload(self, query: str, limit: int = None) -> str:
         """
         Execute given SQL query and return result as a formatted string or path to a saved file.
         """
         try:
-            df = self._exec_query(query, limit)
-            csv_data = df.to_csv().encode("utf-8")
-            file_name, file_path = self.code_interpreter.upload_file(csv_data)
-            return f"sql:\n```\n{query}\n```\n\nsample results:\n{df.head()}\n\nfull result was uploaded with File Name: {file_name} (accessible in Code Interpreter: {file_path})"
+            result_file, sample_df, schema, row_count, bytes_stats = (
+                self._write_query_result(query, limit)
+            )
+            extension, read_hint = TRANSFER_FORMATS[self.transfer_format]
+            with result_file:
+                file_name, file_path = self.code_interpreter.upload_file(
+                    result_file, f"query_result{extension}"
+                )
+            schema_str = "\n".join(f"- {field.name}: {field.type}" for field in schema)
+            dataset_info = self.code_interpreter.describe_dataset(file_name)
+            return f"sql:\n```\n{query}\n```\n\n{self._format_bytes_stats(bytes_stats)}\n\nsample results:\n{sample_df}\n\nfull result ({row_count} rows) was uploaded with File Name: {file_name} (accessible in Code Interpreter: {file_path})\nfile format: {self.transfer_format} (read with `{read_hint.format(path=repr(file_path))}`)\nschema:\n{schema_str}\n{dataset_info}"
+        except QueryCancelledError:
+            return "SQL execution was cancelled by the user. Do not retry unless the user asks again."
+        except QueryTimeoutError as e:
+            return f"SQL execution timed out and the BigQuery job was cancelled: {e}.\nNarrow the query (fewer columns, shorter date range) and try again."
+        except QueryBudgetExceededError as e:
+            return f"""SQL was not executed because it would scan too much data: {e}.
+Rewrite the query to scan less data and try again:
+- select only the columns you need (avoid SELECT *)
+- filter on the partition column (e.g. refresh_date / week) to a narrower range
+- use `TABLESAMPLE SYSTEM (n PERCENT)` for exploratory analysis
+- note that LIMIT does not reduce the bytes scanned
+```
+{query}
+```"""
         except Exception as e:
             return f"SQL execution failed. Error message is as follows:\n```\n{e}\n```"
 
-    def _generate_sql_for_table_info(self, table_name: str) -> tuple:
-        """지정된 테이블의 스키마와 샘플 데이터를 가져오는 SQL 생성"""
-        get_schema_sql = f"""
+    def _generate_schema_sql(self, table_names: list) -> str:
+        """지정된 테이블들의 스키마를 한 번의 쿼리로 가져오는 SQL 생성"""
+        table_names_sql = ", ".join(f'"{name}"' for name in sorted(table_names))
+        return f"""
         SELECT
+            table_name,
             TO_JSON_STRING(
                 ARRAY_AGG(
                     STRUCT(
@@ -87,10 +995,14 @@ class BigQueryClient:
         FROM
             `{self.dataset_project_id}.{self.dataset_id}.INFORMATION_SCHEMA.COLUMNS`
         WHERE
-            table_name = "{table_name}"
+            table_name IN ({table_names_sql})
+        GROUP BY
+            table_name
         """
 
-        sample_data_sql = f"""
+    def _generate_sample_data_sql(self, table_name: str) -> str:
+        """list_rows를 사용할 수 없는 테이블(뷰 등)용 샘플 데이터 SQL 생성"""
+        return f"""
         SELECT
             *
         FROM
@@ -98,32 +1010,197 @@ class BigQueryClient:
         LIMIT
             3
         """
-        return get_schema_sql, sample_data_sql
 
-    def get_table_info(self, table_name: str) -> str:
-        """테이블 스키마와 샘플 데이터를 반환"""
-        get_schema_sql, sample_data_sql = self._generate_sql_for_table_info(table_name)
-        schema = self._exec_query(get_schema_sql).to_string(index=False)
-        sample_data = self._exec_query(sample_data_sql).to_string(index=False)
-        table_info = f"""
+    def _fetch_schemas(self, keys: list) -> dict:
+        """catalog key 목록에 해당하는 테이블 스키마를 한 번의 쿼리로 가져옴"""
+        table_names = [key[-1] for key in keys]
+        df = self._exec_query(self._generate_schema_sql(table_names), use_cache=False)
+        schemas = dict(zip(df.table_name, df.schema))
+        return {
+            key: schemas.get(key[-1], f"Table not found: {key[-1]}") for key in keys
+        }
+
+    def _fetch_sample_data(self, table_name: str) -> str:
+        """
+        쿼리 job 없이 tabledata.list(list_rows)로 샘플 3행을 가져옴
+        뷰처럼 list_rows를 지원하지 않는 경우에만 SELECT ... LIMIT 3 쿼리를 실행
+        """
+        table_id = f"{self.dataset_project_id}.{self.dataset_id}.{table_name}"
+        try:
+            with trace_span("bigquery.list_rows", table=table_name):
+                df = self.client.list_rows(table_id, max_results=3).to_dataframe()
+        except Exception:
+            try:
+                df = self._exec_query(self._generate_sample_data_sql(table_name), use_cache=False)
+            except Exception as e:
+                # 없는 테이블명 등은 해당 테이블의 결과로만 표시하고 나머지 테이블 정보는 그대로 반환
+                return CatalogLookupError(f"Sample data not available for {table_name}: {e}")
+        return df.to_string(index=False)
+
+    def _fetch_samples(self, keys: list) -> dict:
+        """catalog key 목록에 해당하는 샘플 데이터를 병렬로 가져옴"""
+        with ThreadPoolExecutor(max_workers=min(len(keys), 8)) as executor:
+            futures = [
+                executor.submit(contextvars.copy_context().run, self._fetch_sample_data, key[-1])
+                for key in keys
+            ]
+            return {key: future.result() for key, future in zip(keys, futures)}
+
+    def get_tables_info(self, table_names: List[str]) -> str:
+        """
+        여러 테이블의 스키마와 샘플 데이터를 한 번에 반환
+        스키마는 한 번의 INFORMATION_SCHEMA 쿼리로, 샘플 데이터는 병렬로 가져오며
+        두 작업도 동시에 실행하므로 테이블 수와 관계없이 대략 한 번의 왕복으로 끝남
+        """
+        table_names = list(dict.fromkeys(name.strip() for name in table_names))
+        schema_keys = [self._catalog_key("schema", name) for name in table_names]
+        sample_keys = [self._catalog_key("sample", name) for name in table_names]
+
+        # 각 thread의 BigQuery span이 현재 tool 호출 span 아래에 기록되도록 context를 복사해서 실행
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            schemas_future = executor.submit(
+                contextvars.copy_context().run,
+                table_catalog_cache.get_many, schema_keys, self._fetch_schemas,
+            )
+            samples_future = executor.submit(
+                contextvars.copy_context().run,
+                table_catalog_cache.get_many, sample_keys, self._fetch_samples,
+            )
+            schemas = schemas_future.result()
+            samples = samples_future.result()
+
+        tables_info = []
+        for name, schema_key, sample_key in zip(table_names, schema_keys, sample_keys):
+            tables_info.append(f"""
+        ## {name}
+
         ### schema
         ```
-        {schema}
+        {schemas[schema_key]}
         ```
 
         ### sample_data
         ```
-        {sample_data}
+        {samples[sample_key]}
         ```
+        """)
+        return "\n".join(tables_info)
+
+    def get_table_info(self, table_name: str) -> str:
+        """테이블 스키마와 샘플 데이터를 반환"""
+        return self.get_tables_info([table_name])
+
+    def _get_column_types(self, table_name: str) -> dict:
+        """catalog 캐시의 스키마에서 {컬럼명: 타입}을 가져옴"""
+        key = self._catalog_key("schema", table_name)
+        schema = table_catalog_cache.get_many([key], self._fetch_schemas)[key]
+        try:
+            return {column["name"]: column["type"] for column in json.loads(schema)}
+        except (TypeError, ValueError):
+            raise ValueError(f"Unknown table: {table_name}")
+
+    def _compile_aggregation_sql(self, spec: AggregateQueryInput) -> str:
+        """집계 스펙을 BigQuery SQL로 변환. 컬럼명은 테이블 스키마로 검증"""
+        column_types = self._get_column_types(spec.table_name)
+
+        def column(name: str) -> str:
+            if name not in column_types:
+                raise ValueError(f"Unknown column `{name}` in table {spec.table_name}")
+            return f"`{name}`"
+
+        select_exprs = []
+        group_by = []
+        for dimension in spec.dimensions:
+            select_exprs.append(column(dimension))
+            group_by.append(column(dimension))
+
+        bucket_alias = None
+        if spec.time_bucket is not None:
+            bucket_column = column(spec.time_bucket.column)
+            column_type = column_types[spec.time_bucket.column]
+            trunc_func = {"TIMESTAMP": "TIMESTAMP_TRUNC", "DATETIME": "DATETIME_TRUNC"}.get(
+                column_type, "DATE_TRUNC"
+            )
+            bucket_alias = f"{spec.time_bucket.column}_{spec.time_bucket.granularity.lower()}"
+            select_exprs.insert(
+                0,
+                f"{trunc_func}({bucket_column}, {spec.time_bucket.granularity}) AS {bucket_alias}",
+            )
+            group_by.insert(0, bucket_alias)
+
+        measure_aliases = []
+        for measure in spec.measures:
+            target = "*" if measure.column == "*" else column(measure.column)
+            if target == "*" and measure.agg != "COUNT":
+                raise ValueError("'*' can only be used with COUNT")
+            alias = measure.alias or f"{measure.agg.lower()}_{measure.column.strip('*') or 'rows'}"
+            if not _IDENTIFIER_PATTERN.match(alias):
+                raise ValueError(f"Invalid alias: {alias}")
+            if measure.agg == "COUNT_DISTINCT":
+                select_exprs.append(f"COUNT(DISTINCT {target}) AS {alias}")
+            else:
+                select_exprs.append(f"{measure.agg}({target}) AS {alias}")
+            measure_aliases.append(alias)
+
+        where = []
+        for f in spec.filters:
+            if (f.op in ("IN", "NOT IN")) != isinstance(f.value, list):
+                raise ValueError(f"IN / NOT IN (and only those) take a list value: {f.column}")
+            where.append(f"{column(f.column)} {f.op} {_sql_literal(f.value)}")
+
+        select_sql = ",\n  ".join(select_exprs)
+        sql = f"SELECT\n  {select_sql}\n"
+        sql += f"FROM\n  `{self.dataset_project_id}.{self.dataset_id}.{spec.table_name}`\n"
+        if where:
+            where_sql = "\n  AND ".join(where)
+            sql += f"WHERE\n  {where_sql}\n"
+        if group_by:
+            sql += f"GROUP BY\n  {', '.join(group_by)}\n"
+
+        order_by = spec.order_by or measure_aliases[0]
+        if order_by == bucket_alias:
+            # time bucket 순서(시간순)로 정렬
+            if spec.top_n is not None:
+                raise ValueError("top_n needs order_by to be a measure alias or dimension, not the time bucket")
+            sql += f"ORDER BY\n  {bucket_alias}"
+            return sql
+        if order_by not in measure_aliases and order_by not in spec.dimensions:
+            raise ValueError(
+                f"order_by must be a measure alias, dimension or time bucket alias: {order_by}"
+            )
+        order_expr = order_by if order_by in measure_aliases else column(order_by)
+
+        if spec.top_n is not None:
+            partition_by = [column(name) for name in spec.top_n_partition_by]
+            if spec.time_bucket is not None:
+                partition_by.insert(0, group_by[0])
+            partition_sql = f"PARTITION BY {', '.join(partition_by)} " if partition_by else ""
+            sql += (
+                f"QUALIFY ROW_NUMBER() OVER ({partition_sql}ORDER BY {order_expr} DESC)"
+                f" <= {int(spec.top_n)}\n"
+            )
+        sql += f"ORDER BY\n  {', '.join(group_by[:1] + [f'{order_expr} DESC'])}"
+        return sql
+
+    def aggregate_and_upload(self, **spec) -> str:
+        """
+        집계 스펙을 SQL로 변환하여 BigQuery에서 집계한 결과만 가져옴
+        원본 행은 Code Interpreter로 전송하지 않음
         """
-        return table_info
+        try:
+            spec = AggregateQueryInput.model_validate(spec)
+            sql = self._compile_aggregation_sql(spec)
+        except Exception as e:
+            # 오류를 tool 결과로 돌려주어 agent turn이 중단되지 않고 model이 스펙을 고칠 수 있게 함
+            return f"Invalid aggregation spec. Error message is as follows:\n```\n{e}\n```"
+        return self.exec_query_and_upload(sql, spec.limit)
 
     def exec_query_tool(self):
         exec_query_tool_description = f"""
         BigQuery에서 SQL 쿼리를 실행하는 도구입니다.
         SQL 쿼리를 입력하면 BigQuery에서 실행됩니다.
 
-        이 도구를 사용하기 전에 `get_table_info_tool` 도구로
+        이 도구를 사용하기 전에 `sql_table_info` 도구로
         테이블 스키마를 확인하는 것을 **강력히** 권장합니다.
 
         BigQuery용 쿼리를 작성할 때는
@@ -135,14 +1212,18 @@ class BigQueryClient:
         - table_id: {self.table_names_str}
 
         SQL은 가독성을 고려해 작성해주세요 (예: 줄바꿈 등을 포함).
+        실행 전에 dry run으로 스캔량을 확인하며, 쿼리당 {format_bytes(self.budget.max_bytes_per_query)}
+        (세션 전체 {format_bytes(self.budget.max_bytes_per_session)})를 넘는 쿼리는 실행되지 않습니다.
+        필요한 컬럼만 선택하고 파티션 컬럼으로 기간을 좁혀주세요.
         최빈값을 구할 때는 "Mod" 함수를 사용해주세요.
 
-        샘플 외의 전체 결과는 Code Interpreter에 CSV 파일로 저장됩니다.
-        Code Interpreter에서 Python을 실행하여 접근할 수 있습니다.
+        샘플 외의 전체 결과는 Code Interpreter에 {self.transfer_format} 파일로 저장됩니다.
+        Code Interpreter에서 `{TRANSFER_FORMATS[self.transfer_format][1].format(path='file_path')}`로 읽을 수 있으며,
+        결과의 컬럼명과 타입은 도구 실행 결과의 schema에 표시됩니다.
         """
         return StructuredTool.from_function(
             name="exec_query",
-            func=self.exec_query_and_upload,
+            func=self._limit_concurrency(self.exec_query_and_upload),
             description=exec_query_tool_description,
             args_schema=ExecSqlInput,
         )
@@ -151,12 +1232,42 @@ class BigQueryClient:
         sql_table_info_tool_description = f"""
         BigQuery 테이블의 스키마와 샘플 데이터(3행)를 가져오는 도구
         SQL 쿼리를 작성할 때 테이블 스키마를 참조할 수 있음
+        여러 테이블을 확인할 때는 한 번의 호출에 테이블명을 모두 넘겨주세요
 
         이용 가능한 테이블은 다음과 같습니다: {self.table_names_str}
         """
-        return Tool.from_function(
+        return StructuredTool.from_function(
             name="sql_table_info",
-            func=self.get_table_info,
+            func=self._limit_concurrency(self.get_tables_info),
             description=sql_table_info_tool_description,
             args_schema=SqlTableInfoInput,
         )
+
+    def aggregate_query_tool(self):
+        aggregate_query_tool_description = f"""
+        SQL을 직접 작성하지 않고 BigQuery에서 집계한 결과만 가져오는 도구입니다.
+        GROUP BY / 집계 / 기간별 집계 / 그룹별 상위 N개 같은 분석은
+        원본 데이터를 가져와 pandas로 처리하지 말고 이 도구를 우선 사용해주세요.
+
+        - dimensions: GROUP BY할 컬럼
+        - measures: 집계 함수 (COUNT, COUNT_DISTINCT, SUM, AVG, MIN, MAX)
+        - filters: WHERE 조건 (AND로 결합)
+        - time_bucket: 날짜 컬럼을 DAY / WEEK / MONTH / QUARTER / YEAR 단위로 묶음
+        - top_n, top_n_partition_by: 그룹별 상위 N개 (예: 국가별 주간 상위 10개 검색어)
+        - order_by: 정렬 기준 measure alias / dimension (time bucket alias(예: week_week)를 지정하면 시간순)
+
+        예) 국가별 주간 상위 5개 검색어:
+        table_name="international_top_terms", dimensions=["country_name", "term"],
+        measures=[{{"column": "score", "agg": "MAX", "alias": "max_score"}}],
+        time_bucket={{"column": "week", "granularity": "WEEK"}},
+        top_n=5, top_n_partition_by=["country_name"]
+
+        집계 결과는 exec_query와 같은 방식으로 Code Interpreter에 {self.transfer_format} 파일로 저장됩니다.
+        이용 가능한 테이블은 다음과 같습니다: {self.table_names_str}
+        """
+        return StructuredTool.from_function(
+            name="aggregate_query",
+            func=self._limit_concurrency(self.aggregate_and_upload),
+            description=aggregate_query_tool_description,
+            args_schema=AggregateQueryInput,
+        )